@@ -0,0 +1,66 @@
+"""Compare server leaderboard lookups: SQLite join + Python ranking vs the in-memory index.
+
+Usage: python -m benchmarks.leaderboard_bench [sizes...]   (default: 10000 100000 1000000)
+
+Builds a throwaway database per size, puts every user in one guild and times
+top-10, rank-of-user and a balance update through both paths.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+import database.coin_db as coin_db
+from database.leaderboard_index import LeaderboardIndex
+
+GUILD_ID = 1
+TRIALS = 200
+SQL_TRIALS = 10  # the SQL path scans the whole guild, so sample it less
+
+
+def timed(func, trials=TRIALS):
+    start = time.perf_counter()
+    for _ in range(trials):
+        func()
+    return (time.perf_counter() - start) / trials * 1000
+
+
+def run(size):
+    coin_db.close_db()
+    coin_db.DB_FILE = os.path.join(tempfile.mkdtemp(), "bench.db")
+    coin_db.init_db()
+    with coin_db.transaction() as c:
+        c.executemany(
+            "INSERT INTO SMILES (user_id, balance) VALUES (?, ?)",
+            ((str(i), random.randint(0, 100000)) for i in range(size))
+        )
+    coin_db.sync_guild_members(GUILD_ID, range(size))
+
+    index = LeaderboardIndex()
+    start = time.perf_counter()
+    index.load()
+    load_ms = (time.perf_counter() - start) * 1000
+
+    users = [random.randrange(size) for _ in range(TRIALS)]
+    pick = iter(users * 4).__next__
+
+    results = {
+        "top 10 (sql)": timed(lambda: coin_db.get_guild_leaderboard(GUILD_ID, 10), SQL_TRIALS),
+        "top 10 (index)": timed(lambda: index.guild_page(GUILD_ID, 10)),
+        "rank (sql)": timed(lambda: coin_db.get_guild_rank(GUILD_ID, pick()), SQL_TRIALS),
+        "rank (index)": timed(lambda: index.guild_rank(GUILD_ID, pick())),
+        "update (index only)": timed(lambda: index.on_balance_change([(str(pick()), random.randint(0, 100000))])),
+    }
+    index.close()
+    coin_db.close_db()
+
+    print(f"\n{size:,} users (index load {load_ms:.0f} ms)")
+    for name, ms in results.items():
+        print(f"  {name:<22}{ms:10.3f} ms")
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10000, 100000, 1000000]
+    for size in sizes:
+        run(size)
@@ -0,0 +1,103 @@
+"""Flash-sale load test: many users buying a limited-stock item at the same moment.
+
+Usage: python -m benchmarks.shop_flash_sale [attempts] [stock]   (default: 1000 100)
+
+Builds a throwaway database, lists one item with limited stock and fires every
+purchase attempt at once through the same path BuyButton uses
+(purchase_item_async, then Shop.update_stock). Some buyers can't afford the
+item. Afterwards it checks that nothing was oversold, that every sale has its
+ticket and ledger row, that balances add up, and counts listing redraws.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+import database.coin_db as coin_db
+import database.shop_db as shop_db
+from commands.shop_system import Shop
+
+PRICE = 50
+BROKE_EVERY = 10  # every 10th buyer can't afford the item
+ITEM_ID = "item_flash"
+
+
+class CountingShop(Shop):
+    """Shop cog that counts listing redraws instead of editing a Discord message."""
+
+    def __init__(self):
+        super().__init__(bot=None)
+        self.redraws = 0
+
+    async def _redraw_listing(self, item_id):
+        self.redraws += 1
+
+
+async def run(attempts, stock):
+    coin_db.close_db()
+    workdir = tempfile.mkdtemp()
+    coin_db.DB_FILE = os.path.join(workdir, "bench.db")
+    shop_db.SHOP_ITEMS_FILE = os.path.join(workdir, "shop_items.json")
+    shop_db.SHOP_TICKETS_FILE = os.path.join(workdir, "shop_tickets.json")
+    coin_db.init_db()
+    shop_db.init_shop_db()
+
+    with coin_db.transaction() as c:
+        c.executemany(
+            "INSERT INTO SMILES (user_id, balance) VALUES (?, ?)",
+            ((str(i), PRICE // 5 if i % BROKE_EVERY == 0 else PRICE * 2) for i in range(attempts))
+        )
+    total_before = coin_db.fetch_one("SELECT SUM(balance) FROM SMILES")[0]
+
+    shop = CountingShop()
+    await shop.catalog.load()
+    await shop.catalog.add(ITEM_ID, {"title": "Flash item", "price": PRICE, "stock": stock})
+
+    async def attempt(i):
+        status, _, left = await shop_db.purchase_item_async(ITEM_ID, i, f"user{i}", f"ticket_{i}")
+        if status == "ok":
+            shop.update_stock(ITEM_ID, left)
+        elif status == "sold_out":
+            shop.update_stock(ITEM_ID, 0)
+        return status
+
+    start = time.perf_counter()
+    statuses = await asyncio.gather(*(attempt(i) for i in range(attempts)))
+    elapsed = time.perf_counter() - start
+    for updater in shop.stock_updaters.values():
+        updater.cancel()
+
+    sold = statuses.count("ok")
+    stock_left = coin_db.fetch_one("SELECT stock FROM shop_items WHERE item_id = ?", (ITEM_ID,))[0]
+    tickets = coin_db.fetch_one("SELECT COUNT(*) FROM shop_tickets WHERE item_id = ?", (ITEM_ID,))[0]
+    shop_ledger = coin_db.fetch_one("SELECT COUNT(*), COALESCE(SUM(delta), 0) FROM ledger WHERE reason = 'shop'")
+    total_after = coin_db.fetch_one("SELECT SUM(balance) FROM SMILES")[0]
+    negative = coin_db.fetch_one("SELECT COUNT(*) FROM SMILES WHERE balance < 0")[0]
+    coin_db.close_db()
+
+    checks = {
+        "sold exactly the stock": sold == min(stock, attempts - attempts // BROKE_EVERY),
+        "stock never below zero": stock_left == stock - sold and stock_left >= 0,
+        "one ticket per sale": tickets == sold,
+        "one ledger row per sale": tuple(shop_ledger) == (sold, -sold * PRICE),
+        "balances add up": total_before - total_after == sold * PRICE,
+        "no negative balances": negative == 0,
+        "in-memory stock matches": shop.catalog.get(ITEM_ID)["stock"] == stock_left,
+    }
+
+    print(f"\n{attempts:,} concurrent attempts on {stock:,} units ({elapsed * 1000:.0f} ms, "
+          f"{attempts / elapsed:,.0f} purchases/s)")
+    for status in ("ok", "sold_out", "funds", "gone"):
+        print(f"  {status:<10}{statuses.count(status):8,}")
+    print(f"  listing redraws: {shop.redraws}")
+    for name, passed in checks.items():
+        print(f"  {'✅' if passed else '❌'} {name}")
+    return all(checks.values())
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:]]
+    attempts = args[0] if args else 1000
+    stock = args[1] if len(args) > 1 else 100
+    sys.exit(0 if asyncio.run(run(attempts, stock)) else 1)
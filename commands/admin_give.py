@@ -1,7 +1,7 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-from database.coin_db import change_balance, get_balance
+from database.coin_db import change_balance_async
 
 class AdminGive(commands.Cog):
     def __init__(self, bot):
@@ -9,8 +9,7 @@ class AdminGive(commands.Cog):
 
     async def give_smiles(self, target_user: discord.User, amount: int, context):
         """DRY helper method to handle smile giving logic"""
-        change_balance(target_user.id, amount)
-        new_balance = get_balance(target_user.id)
+        new_balance = await change_balance_async(target_user.id, amount, "admin_give")
         
         response = f"✅ Gave `{amount}` smiles to {target_user.mention}. New balance: `{new_balance}` smiles."
         
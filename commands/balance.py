@@ -1,31 +1,60 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import app_commands
 from discord.ui import View, Button
 import os
 from dotenv import load_dotenv
-from database.coin_db import change_balance, get_balance, get_top_balances
+from database.coin_db import (
+    change_balance_async, get_balance_async, get_rank_async,
+    queue_balance_change, flush_pending_async, EARN_FLUSH_SIZE,
+    get_ledger_page_async, snapshot_balances_async
+)
+from database.cooldowns import cooldowns
+from utils.pagination import KeysetPaginator, split_page
 import time
 
+HISTORY_PAGE_SIZE = 10
+
 class EarnDaily(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.earn_cooldowns = {}
-        self.daily_cooldowns = {}
         self.repeat_count = {}
         self.last_sender = None
         load_dotenv()
         self.ignored_channels = self._load_ignored_channels()
+        self.flush_earnings.start()
+        self.snapshot_ledger.start()
+
+    async def cog_unload(self):
+        self.flush_earnings.cancel()
+        self.snapshot_ledger.cancel()
+        await flush_pending_async()
+
+    @tasks.loop(seconds=0.5)
+    async def flush_earnings(self):
+        """Write buffered message earnings to the database in one transaction"""
+        try:
+            await flush_pending_async()
+        except Exception as e:
+            print(f"❌ Failed to flush message earnings: {e}")
+
+    @tasks.loop(hours=6)
+    async def snapshot_ledger(self):
+        """Snapshot changed balances so they can be rebuilt from a short ledger tail"""
+        try:
+            await snapshot_balances_async()
+        except Exception as e:
+            print(f"❌ Failed to snapshot balances: {e}")
 
     def _load_ignored_channels(self):
         """Load ignored channel IDs from .env"""
         ignored = os.getenv("IGNORED_CHANNELS", "")
         return [int(x.strip()) for x in ignored.split(",") if x.strip()]
 
-    def is_on_cooldown(self, user_id: int, cooldown_seconds: int, cooldown_map: dict):
-        now = time.time()
-        last_used = cooldown_map.get(user_id, 0)
-        return (now - last_used < cooldown_seconds, last_used + cooldown_seconds - now)
+    def claim_cooldown(self, user_id: int, scope: str, seconds: int):
+        """Start the cooldown if it isn't running; the check and start are one step"""
+        time_left = cooldowns.try_start(scope, user_id, seconds)
+        return (time_left > 0, time_left)
 
     def format_time_left(self, seconds_left, command_type):
         if command_type == "daily":
@@ -38,14 +67,43 @@ class EarnDaily(commands.Cog):
             return f"{int(minutes)}m {int(seconds)}s"
 
     async def get_user_rank(self, user_id):
-        top_users = get_top_balances(1000)
-        for rank, (uid, _) in enumerate(top_users, start=1):
-            if str(uid) == str(user_id):
-                return rank
-        return None
+        return await get_rank_async(user_id)
+
+    async def add_smiles(self, user: discord.User, amount: int, reason: str):
+        """Credit the user and return their new balance"""
+        return await change_balance_async(user.id, amount, reason)
+
+    async def grant_reward(self, user: discord.User, amount: int, scope: str):
+        """Credit a claimed earn/daily reward; the claim is released if the credit fails"""
+        try:
+            return await self.add_smiles(user, amount, scope)
+        except Exception:
+            cooldowns.release(scope, user.id)
+            raise
+
+    def build_history_embed(self, user, rows):
+        embed = discord.Embed(
+            title=f"{user.display_name}'s Smiles History",
+            color=discord.Color.gold()
+        )
+        if not rows:
+            embed.description = "No transactions yet."
+            return embed
+
+        lines = []
+        for _, delta, balance, reason, ref_id, ts in rows:
+            ref = f" `{ref_id}`" if ref_id else ""
+            lines.append(f"<t:{ts}:R> **{delta:+}** ({reason}{ref}) → `{balance}`")
+        embed.description = "\n".join(lines)
+        return embed
 
-    async def add_smiles(self, user: discord.User, amount: int):
-        change_balance(user.id, amount)
+    def history_paginator(self, user):
+        """Ledger history newest first, one (ts, id) keyset page at a time"""
+        async def load_page(after):
+            rows = await get_ledger_page_async(user.id, after, HISTORY_PAGE_SIZE + 1)
+            rows, next_after = split_page(rows, HISTORY_PAGE_SIZE, lambda row: (row[5], row[0]))
+            return self.build_history_embed(user, rows), next_after
+        return KeysetPaginator(load_page, owner_id=user.id)
 
     class BalanceView(View):
         def __init__(self, cog):
@@ -64,7 +122,7 @@ class EarnDaily(commands.Cog):
         
         async def earn_callback(self, interaction: discord.Interaction):
             user_id = interaction.user.id
-            on_cooldown, time_left = self.cog.is_on_cooldown(user_id, 3600, self.cog.earn_cooldowns)
+            on_cooldown, time_left = self.cog.claim_cooldown(user_id, "earn", 3600)
             if on_cooldown:
                 readable_time = self.cog.format_time_left(time_left, "earn")
                 await interaction.response.send_message(
@@ -75,9 +133,7 @@ class EarnDaily(commands.Cog):
                 return
 
             await interaction.response.defer()
-            await self.cog.add_smiles(interaction.user, 50)
-            self.cog.earn_cooldowns[user_id] = time.time()
-            new_balance = get_balance(user_id)
+            new_balance = await self.cog.grant_reward(interaction.user, 50, "earn")
             await interaction.followup.send(
                 f"🎉 You earned 50 smiles!\n"
                 f"💰 New balance: `{new_balance}` smiles\n"
@@ -86,7 +142,7 @@ class EarnDaily(commands.Cog):
         
         async def daily_callback(self, interaction: discord.Interaction):
             user_id = interaction.user.id
-            on_cooldown, time_left = self.cog.is_on_cooldown(user_id, 86400, self.cog.daily_cooldowns)
+            on_cooldown, time_left = self.cog.claim_cooldown(user_id, "daily", 86400)
             if on_cooldown:
                 readable_time = self.cog.format_time_left(time_left, "daily")
                 await interaction.response.send_message(
@@ -97,9 +153,7 @@ class EarnDaily(commands.Cog):
                 return
 
             await interaction.response.defer()
-            await self.cog.add_smiles(interaction.user, 50)
-            self.cog.daily_cooldowns[user_id] = time.time()
-            new_balance = get_balance(user_id)
+            new_balance = await self.cog.grant_reward(interaction.user, 50, "daily")
             await interaction.followup.send(
                 f"🎁 Daily reward claimed! +50 smiles\n"
                 f"💰 New balance: `{new_balance}` smiles\n"
@@ -110,7 +164,7 @@ class EarnDaily(commands.Cog):
     @app_commands.command(name="earn", description="Earn 50 smiles (1 hour cooldown)")
     async def slash_earn(self, interaction: discord.Interaction):
         user_id = interaction.user.id
-        on_cooldown, time_left = self.is_on_cooldown(user_id, 3600, self.earn_cooldowns)
+        on_cooldown, time_left = self.claim_cooldown(user_id, "earn", 3600)
         if on_cooldown:
             readable_time = self.format_time_left(time_left, "earn")
             await interaction.response.send_message(
@@ -121,9 +175,7 @@ class EarnDaily(commands.Cog):
             return
 
         await interaction.response.defer()
-        await self.add_smiles(interaction.user, 50)
-        self.earn_cooldowns[user_id] = time.time()
-        new_balance = get_balance(user_id)
+        new_balance = await self.grant_reward(interaction.user, 50, "earn")
         await interaction.followup.send(
             f"🎉 You earned 50 smiles!\n"
             f"💰 New balance: `{new_balance}` smiles\n"
@@ -133,7 +185,7 @@ class EarnDaily(commands.Cog):
     @app_commands.command(name="daily", description="Claim your daily 50 smiles (24-hour cooldown)")
     async def slash_daily(self, interaction: discord.Interaction):
         user_id = interaction.user.id
-        on_cooldown, time_left = self.is_on_cooldown(user_id, 86400, self.daily_cooldowns)
+        on_cooldown, time_left = self.claim_cooldown(user_id, "daily", 86400)
         if on_cooldown:
             readable_time = self.format_time_left(time_left, "daily")
             await interaction.response.send_message(
@@ -144,9 +196,7 @@ class EarnDaily(commands.Cog):
             return
 
         await interaction.response.defer()
-        await self.add_smiles(interaction.user, 50)
-        self.daily_cooldowns[user_id] = time.time()
-        new_balance = get_balance(user_id)
+        new_balance = await self.grant_reward(interaction.user, 50, "daily")
         await interaction.followup.send(
             f"🎁 Daily reward claimed! +50 smiles\n"
             f"💰 New balance: `{new_balance}` smiles\n"
@@ -158,7 +208,7 @@ class EarnDaily(commands.Cog):
     async def slash_balance(self, interaction: discord.Interaction, user: discord.User = None):
         target = user or interaction.user
         user_id = target.id
-        bal = get_balance(user_id)
+        bal = await get_balance_async(user_id)
         rank = await self.get_user_rank(user_id)
         
         embed = discord.Embed(
@@ -173,11 +223,17 @@ class EarnDaily(commands.Cog):
         view = discord.utils.MISSING if target != interaction.user else self.BalanceView(self)
         await interaction.response.send_message(embed=embed, view=view)
 
+    @app_commands.command(name="history", description="Show your recent smiles transactions")
+    async def slash_history(self, interaction: discord.Interaction):
+        view = self.history_paginator(interaction.user)
+        embed = await view.start()
+        await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
+
     # Legacy Commands
     @commands.command(name="earn")
     async def legacy_earn(self, ctx: commands.Context):
         user_id = ctx.author.id
-        on_cooldown, time_left = self.is_on_cooldown(user_id, 3600, self.earn_cooldowns)
+        on_cooldown, time_left = self.claim_cooldown(user_id, "earn", 3600)
         if on_cooldown:
             readable_time = self.format_time_left(time_left, "earn")
             await ctx.send(
@@ -186,9 +242,7 @@ class EarnDaily(commands.Cog):
             )
             return
 
-        await self.add_smiles(ctx.author, 50)
-        self.earn_cooldowns[user_id] = time.time()
-        new_balance = get_balance(user_id)
+        new_balance = await self.grant_reward(ctx.author, 50, "earn")
         await ctx.send(
             f"🎉 You earned 50 smiles!\n"
             f"💰 New balance: `{new_balance}` smiles\n"
@@ -198,7 +252,7 @@ class EarnDaily(commands.Cog):
     @commands.command(name="daily")
     async def legacy_daily(self, ctx: commands.Context):
         user_id = ctx.author.id
-        on_cooldown, time_left = self.is_on_cooldown(user_id, 86400, self.daily_cooldowns)
+        on_cooldown, time_left = self.claim_cooldown(user_id, "daily", 86400)
         if on_cooldown:
             readable_time = self.format_time_left(time_left, "daily")
             await ctx.send(
@@ -207,9 +261,7 @@ class EarnDaily(commands.Cog):
             )
             return
 
-        await self.add_smiles(ctx.author, 50)
-        self.daily_cooldowns[user_id] = time.time()
-        new_balance = get_balance(user_id)
+        new_balance = await self.grant_reward(ctx.author, 50, "daily")
         await ctx.send(
             f"🎁 Daily reward claimed! +50 smiles\n"
             f"💰 New balance: `{new_balance}` smiles\n"
@@ -220,7 +272,7 @@ class EarnDaily(commands.Cog):
     async def legacy_balance(self, ctx: commands.Context, user: discord.User = None):
         target = user or ctx.author
         user_id = target.id
-        bal = get_balance(user_id)
+        bal = await get_balance_async(user_id)
         rank = await self.get_user_rank(user_id)
         
         embed = discord.Embed(
@@ -235,6 +287,12 @@ class EarnDaily(commands.Cog):
         view = discord.utils.MISSING if target != ctx.author else self.BalanceView(self)
         await ctx.send(embed=embed, view=view)
 
+    @commands.command(name="history")
+    async def legacy_history(self, ctx: commands.Context):
+        view = self.history_paginator(ctx.author)
+        embed = await view.start()
+        await ctx.send(embed=embed, view=view)
+
     # Message earning system
     @commands.Cog.listener()
     async def on_message(self, message):
@@ -244,8 +302,9 @@ class EarnDaily(commands.Cog):
             message.content.startswith(('!', '/'))):
             return
 
-        # Always give 1 coin per valid message
-        change_balance(message.author.id, 1)
+        # Always give 1 coin per valid message (buffered, flushed in batches)
+        if queue_balance_change(message.author.id, 1) >= EARN_FLUSH_SIZE:
+            await flush_pending_async()
 
         # Anti-spam (prevents same user getting multiple coins rapidly)
         if self.last_sender == message.author.id:
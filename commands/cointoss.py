@@ -1,6 +1,6 @@
 import random
 from discord.ext import commands
-from database.coin_db import get_balance,change_balance
+from database.coin_db import try_debit_async, change_balance_async
 
 class CoinBet(commands.Cog):
     def __init__(self, bot):
@@ -8,13 +8,14 @@ class CoinBet(commands.Cog):
 
     async def process_bet(self, ctx, user_choice, amount):
         user_id = str(ctx.author.id)
-        balance = get_balance(user_id)
 
         if amount <= 0:
             await ctx.send("Bet amount must be positive.")
             return
 
-        if balance < amount:
+        # Take the stake atomically so concurrent bets can't overspend
+        staked, _ = await try_debit_async(user_id, amount, "cointoss")
+        if not staked:
             await ctx.send("You don't have enough smiles.")
             return
 
@@ -22,10 +23,9 @@ class CoinBet(commands.Cog):
         win = result == user_choice
 
         if win:
-            change_balance(user_id, amount)  # Give back + double
+            await change_balance_async(user_id, amount * 2, "cointoss")  # Give back + double
             await ctx.send(f"🪙 It's **{result}**! You won 🎉 and gained `{amount}` smiles.")
         else:
-            change_balance(user_id, -amount)  # Deduct only
             await ctx.send(f"🪙 It's **{result}**! You lost 😢 `{amount}` smiles.")
 
     @commands.command(name="heads")
@@ -1,77 +1,251 @@
+import threading
+import time
 import discord
 from discord import app_commands
 from discord.ext import commands
-from database.coin_db import get_top_balances, get_balance
+from database.coin_db import (
+    get_balance_async, get_guild_leaderboard_async, get_guild_rank_async,
+    add_guild_member_async, remove_guild_member_async,
+    is_guild_synced_async, sync_guild_members_async, run_db,
+    add_balance_listener, remove_balance_listener
+)
+from database.leaderboard_index import LeaderboardIndex
+from utils.pagination import KeysetPaginator, split_page
+
+LEADERBOARD_PAGE_MAX = 25  # embed field limit
+
+
+class LeaderboardCache:
+    """Finished first leaderboard pages per (guild, count).
+
+    An entry lives for at most `ttl` seconds, and is dropped early when a
+    balance inside its window changes, a balance climbs into the window,
+    or the guild's membership changes. Balance changes arrive on the
+    database thread, hence the lock.
+    """
+
+    def __init__(self, ttl=30):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, guild_id, count):
+        key = (str(guild_id), count)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry['expires_at'] > time.monotonic():
+                self.hits += 1
+                return entry['payload']
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+
+    def put(self, guild_id, count, payload, ranked_users):
+        # A window that isn't full can be entered by any balance at all
+        floor = ranked_users[-1]['balance'] if len(ranked_users) >= count else None
+        with self._lock:
+            self._entries[(str(guild_id), count)] = {
+                'expires_at': time.monotonic() + self.ttl,
+                'payload': payload,
+                'user_ids': {str(u['user_id']) for u in ranked_users},
+                'floor': floor,
+            }
+
+    def invalidate_guild(self, guild_id):
+        gid = str(guild_id)
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == gid]:
+                del self._entries[key]
+                self.invalidations += 1
+
+    def on_balance_change(self, changes, guilds_of):
+        with self._lock:
+            if not self._entries:
+                return
+            for user_id, balance in changes:
+                # Without membership info every guild has to be treated as affected
+                guilds = guilds_of(user_id) if guilds_of else None
+                for key in list(self._entries):
+                    entry = self._entries[key]
+                    if guilds is not None and key[0] not in guilds:
+                        continue
+                    if user_id in entry['user_ids'] or entry['floor'] is None or balance >= entry['floor']:
+                        del self._entries[key]
+                        self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total * 100, 1) if total else 0,
+                'invalidations': self.invalidations,
+                'entries': len(self._entries),
+            }
+
 
 class Leaderboard(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.index = LeaderboardIndex()
+        self.cache = LeaderboardCache()
 
-    async def get_server_member_ids(self, guild):
-        """Fetch all server member IDs"""
-        if not guild.chunked:
-            await guild.chunk()
-        return {str(member.id) for member in guild.members}
+    async def cog_load(self):
+        try:
+            await run_db(self.index.load)
+        except Exception as e:
+            print(f"❌ Failed to load leaderboard index, using SQL ranking: {e}")
+        add_balance_listener(self.on_balance_change)
 
-    async def get_ranked_server_users(self, guild, limit=None):
-        """Get all users with their ranks, filtered to server members"""
-        all_users = get_top_balances(limit or 1000)
-        server_member_ids = await self.get_server_member_ids(guild)
-        
-        ranked_users = []
-        current_rank = 0
-        last_balance = None
-        real_rank = 0
-        
-        for user_id, balance in all_users:
-            if str(user_id) in server_member_ids:
-                real_rank += 1
-                if balance != last_balance:
-                    current_rank = real_rank
-                ranked_users.append({
-                    'user_id': user_id,
-                    'balance': balance,
-                    'rank': current_rank
-                })
-                last_balance = balance
-                
-        return ranked_users
+    async def cog_unload(self):
+        remove_balance_listener(self.on_balance_change)
+        self.index.close()
 
-    @app_commands.command(name="leaderboard", description="Show the top smiles holders in this server")
-    @app_commands.describe(count="Number of top users to display (default 10)")
-    async def leaderboard(self, interaction: discord.Interaction, count: int = 10):
-        await interaction.response.defer()
-        
-        ranked_users = await self.get_ranked_server_users(interaction.guild, count)
-        
-        if not ranked_users:
-            await interaction.followup.send("No server members found in the leaderboard.", ephemeral=True)
-            return
+    def on_balance_change(self, changes):
+        self.cache.on_balance_change(changes, self.index.guilds_of if self.index.ready else None)
 
+    def build_leaderboard_embed(self, guild, ranked_users):
         embed = discord.Embed(
             title="🏆 Server smiles Leaderboard",
             color=discord.Color.gold()
         )
+        if not ranked_users:
+            embed.description = "No more members to show."
 
-        for user in ranked_users[:count]:
-            member = interaction.guild.get_member(int(user['user_id']))
+        for user in ranked_users:
+            member = guild.get_member(int(user['user_id']))
             display_name = member.display_name if member else f"Unknown User ({user['user_id']})"
             embed.add_field(
                 name=f"#{user['rank']} {display_name}",
                 value=f"💰 {user['balance']} smiles",
                 inline=False
             )
+        return embed
+
+    async def render_leaderboard(self, guild, count):
+        """First leaderboard page for a server and the cursor to the next one,
+        served from the cache when nothing changed. (None, None) if nobody is ranked."""
+        payload = self.cache.get(guild.id, count)
+        if payload is not None:
+            return discord.Embed.from_dict(payload['embed']), payload['next']
+
+        rows = await self.get_ranked_server_users(guild, count + 1)
+        if not rows:
+            return None, None
+        ranked_users, next_after = split_page(rows, count, self.leaderboard_key)
+
+        embed = self.build_leaderboard_embed(guild, ranked_users)
+        self.cache.put(guild.id, count, {'embed': embed.to_dict(), 'next': next_after}, ranked_users)
+        return embed, next_after
+
+    @staticmethod
+    def leaderboard_key(user):
+        return (user['balance'], user['user_id'])
+
+    def leaderboard_paginator(self, guild, count, owner_id):
+        """Leaderboard pages after the first are fetched by (balance, user_id) keyset"""
+        count = max(1, min(count, LEADERBOARD_PAGE_MAX))
+
+        async def load_page(after):
+            if after is None:
+                return await self.render_leaderboard(guild, count)
+            rows = await self.get_ranked_server_users(guild, count + 1, after=after)
+            ranked_users, next_after = split_page(rows, count, self.leaderboard_key)
+            return self.build_leaderboard_embed(guild, ranked_users), next_after
+        return KeysetPaginator(load_page, owner_id=owner_id)
+
+    async def bootstrap_guild(self, guild, force=False):
+        """Reconcile the stored members of a server with its current member list.
+
+        Runs on every on_ready so joins and leaves missed while the bot was
+        offline are picked up. The sync marker only saves an explicit chunk
+        request; a guild that isn't chunked is never reconciled against a
+        partial member list.
+        """
+        if not guild.chunked:
+            if not force and await is_guild_synced_async(guild.id):
+                return
+            await guild.chunk()
+        member_ids = [member.id for member in guild.members]
+        added, removed = await sync_guild_members_async(guild.id, member_ids)
+        self.index.sync_guild(guild.id, member_ids)
+        if added or removed:
+            self.cache.invalidate_guild(guild.id)
 
-        await interaction.followup.send(embed=embed)
+    async def get_ranked_server_users(self, guild, limit=10, offset=0, after=None):
+        """Get a page of server members with their ranks, after a (balance, user_id) cursor if given"""
+        if self.index.ready:
+            return self.index.guild_page(guild.id, limit, offset, after)
+        return await get_guild_leaderboard_async(guild.id, limit, offset, after)
+
+    async def get_server_rank(self, guild, user_id):
+        """Rank, balance and ranked member count for one server member"""
+        if self.index.ready:
+            return self.index.guild_rank(guild.id, user_id)
+        return await get_guild_rank_async(guild.id, user_id)
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        for guild in self.bot.guilds:
+            try:
+                await self.bootstrap_guild(guild)
+            except Exception as e:
+                print(f"❌ Failed to index members of {guild.id}: {e}")
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild):
+        await self.bootstrap_guild(guild, force=True)
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member):
+        await add_guild_member_async(member.guild.id, member.id)
+        self.index.add_member(member.guild.id, member.id)
+        self.cache.invalidate_guild(member.guild.id)
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member):
+        await remove_guild_member_async(member.guild.id, member.id)
+        self.index.remove_member(member.guild.id, member.id)
+        self.cache.invalidate_guild(member.guild.id)
+
+    @app_commands.command(name="leaderboard", description="Show the top smiles holders in this server")
+    @app_commands.describe(count="Number of users per page (default 10, max 25)")
+    async def leaderboard(self, interaction: discord.Interaction, count: int = 10):
+        await interaction.response.defer()
+        
+        view = self.leaderboard_paginator(interaction.guild, count, interaction.user.id)
+        embed = await view.start()
+        
+        if not embed:
+            await interaction.followup.send("No server members found in the leaderboard.", ephemeral=True)
+            return
+
+        await interaction.followup.send(embed=embed, view=view)
+
+    @app_commands.command(name="leaderboard_cache", description="Admin: Show leaderboard cache statistics")
+    async def leaderboard_cache(self, interaction: discord.Interaction):
+        if not interaction.user.guild_permissions.manage_messages:
+            await interaction.response.send_message("❌ You don't have permission to use this command.", ephemeral=True)
+            return
+
+        stats = self.cache.stats()
+        await interaction.response.send_message(
+            f"📊 **Leaderboard cache**\n"
+            f"Hits: `{stats['hits']}` · Misses: `{stats['misses']}` · Hit rate: `{stats['hit_rate']}%`\n"
+            f"Invalidations: `{stats['invalidations']}` · Cached embeds: `{stats['entries']}`",
+            ephemeral=True
+        )
 
     @app_commands.command(name="rank", description="Check your smiles rank in this server")
     async def slash_rank(self, interaction: discord.Interaction):
         await interaction.response.defer()
         
-        ranked_users = await self.get_ranked_server_users(interaction.guild)
         user_id = str(interaction.user.id)
-        
-        user_data = next((u for u in ranked_users if str(u['user_id']) == user_id), None)
+        user_data = await self.get_server_rank(interaction.guild, user_id)
         
         if user_data:
             embed = discord.Embed(
@@ -79,7 +253,7 @@ class Leaderboard(commands.Cog):
                 description=(
                     f"🏅 **Rank:** #{user_data['rank']}\n"
                     f"💰 **Balance:** {user_data['balance']} smiles\n"
-                    f"👑 **Top {'%'}:** {self.calculate_top_percentage(user_data['rank'], len(ranked_users))}%"
+                    f"👑 **Top {'%'}:** {self.calculate_top_percentage(user_data['rank'], user_data['total'])}%"
                 ),
                 color=discord.Color.gold()
             )
@@ -89,7 +263,7 @@ class Leaderboard(commands.Cog):
             )
             await interaction.followup.send(embed=embed)
         else:
-            balance = get_balance(user_id)
+            balance = await get_balance_async(user_id)
             await interaction.followup.send(
                 f"You're not ranked yet! Your balance: {balance} smiles",
                 ephemeral=True
@@ -97,36 +271,21 @@ class Leaderboard(commands.Cog):
 
     @commands.command(name="leaderboard")
     async def legacy_leaderboard(self, ctx, count: int = 10):
-        """Show the top smiles holders in this server. Usage: !leaderboard [count]"""
-        ranked_users = await self.get_ranked_server_users(ctx.guild, count)
+        """Show the top smiles holders in this server. Usage: !leaderboard [count per page]"""
+        view = self.leaderboard_paginator(ctx.guild, count, ctx.author.id)
+        embed = await view.start()
         
-        if not ranked_users:
+        if not embed:
             await ctx.send("No server members found in the leaderboard.")
             return
 
-        embed = discord.Embed(
-            title="🏆 Server smiles Leaderboard",
-            color=discord.Color.gold()
-        )
-
-        for user in ranked_users[:count]:
-            member = ctx.guild.get_member(int(user['user_id']))
-            display_name = member.display_name if member else f"Unknown User ({user['user_id']})"
-            embed.add_field(
-                name=f"#{user['rank']} {display_name}",
-                value=f"💰 {user['balance']} smiles",
-                inline=False
-            )
-
-        await ctx.send(embed=embed)
+        await ctx.send(embed=embed, view=view)
 
     @commands.command(name="rank")
     async def legacy_rank(self, ctx):
         """Check your smiles rank in this server. Usage: !rank"""
-        ranked_users = await self.get_ranked_server_users(ctx.guild)
         user_id = str(ctx.author.id)
-        
-        user_data = next((u for u in ranked_users if str(u['user_id']) == user_id), None)
+        user_data = await self.get_server_rank(ctx.guild, user_id)
         
         if user_data:
             embed = discord.Embed(
@@ -134,7 +293,7 @@ class Leaderboard(commands.Cog):
                 description=(
                     f"🏅 **Rank:** #{user_data['rank']}\n"
                     f"💰 **Balance:** {user_data['balance']} smiles\n"
-                    f"👑 **Top {'%'}:** {self.calculate_top_percentage(user_data['rank'], len(ranked_users))}%"
+                    f"👑 **Top {'%'}:** {self.calculate_top_percentage(user_data['rank'], user_data['total'])}%"
                 ),
                 color=discord.Color.gold()
             )
@@ -144,7 +303,7 @@ class Leaderboard(commands.Cog):
             )
             await ctx.send(embed=embed)
         else:
-            balance = get_user_balance(user_id)
+            balance = await get_balance_async(user_id)
             await ctx.send(f"You're not ranked yet! Your balance: {balance} smiles")
 
     def calculate_top_percentage(self, rank, total_users):
@@ -1,88 +1,139 @@
 import discord
 from discord import app_commands
-from discord.ext import commands
-import json
+from discord.ext import commands, tasks
+import functools
 import os
+import re
 from typing import Optional
-from database.coin_db import get_balance, change_balance 
+from utils.coalesce import CoalescedUpdater
+from utils.pagination import KeysetPaginator, split_page
+from database.shop_db import (
+    ShopCatalog, purchase_item_async, refund_purchase_async, get_open_tickets_async,
+    count_open_tickets_async, close_user_tickets_async
+)
+from database.ticket_archive import (
+    ARCHIVE_BATCH, archive_cutoff, archive_closed_tickets_async, search_archive_async
+)
 
-SHOP_DATA_FILE = 'database/shop_items.json'
-TICKETS_FILE = 'database/shop_tickets.json'
 TICKETS_CHANNEL_ID = os.getenv("TICKETS_CHANNEL_ID")  # Set your dedicated channel ID here
+CATALOG_CHECK_INTERVAL = 30  # seconds between checks for catalog edits made outside the bot
+TICKET_PAGE_SIZE = 10
+STOCK_REDRAW_WINDOW = 3  # seconds; a sell-out edits the listing a handful of times, not once per sale
+CATALOG_PAGE_SIZE = 5  # one row of buy buttons
+TICKET_ARCHIVE_DAYS = 30  # closed tickets older than this move to the compressed archive
+
+
+def build_item_embed(item):
+    embed = discord.Embed(
+        title=f"\n",
+        description=f"# **🛍️ {item['title']}**",
+        color=discord.Color.gold()
+    )
+    embed.add_field(name="**Price**", value=f"**{item['price']} smiles**")
+    if item.get('role_id'):
+        embed.add_field(name="**Role**", value=f"<@&{item['role_id']}>")
+    if item.get('stock') is not None:
+        embed.add_field(
+            name="**Stock**",
+            value=f"**{item['stock']} left**" if item['stock'] > 0 else "**Sold out**"
+        )
+    if item.get('image_url'):
+        embed.set_image(url=item['image_url'])
+    return embed
 
-# Ensure data files exist
-for file in [SHOP_DATA_FILE, TICKETS_FILE]:
-    if not os.path.exists(file):
-        with open(file, 'w') as f:
-            json.dump({}, f)
-
-def load_data(file):
-    with open(file, 'r') as f:
-        return json.load(f)
+class BuyButton(discord.ui.DynamicItem[discord.ui.Button], template=r"buy_(?P<item_id>.+)"):
+    """Purchase button for any catalog item.
 
-def save_data(file, data):
-    with open(file, 'w') as f:
-        json.dump(data, f, indent=2)
+    Registered once with bot.add_dynamic_items, so every buy_<item_id>
+    button ever posted is handled without a persistent view per item.
+    """
 
-class BuyButton(discord.ui.Button):
-    def __init__(self, item_id):
+    def __init__(self, item_id, label="Purchase", row=None, disabled=False):
         super().__init__(
-            style=discord.ButtonStyle.green,
-            label="Purchase",
-            custom_id=f"buy_{item_id}"
+            discord.ui.Button(
+                style=discord.ButtonStyle.green,
+                label=label,
+                custom_id=f"buy_{item_id}",
+                row=row,
+                disabled=disabled
+            )
         )
         self.item_id = item_id
 
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(match["item_id"])
+
     async def callback(self, interaction: discord.Interaction):
-        shop_data = load_data(SHOP_DATA_FILE)
-        item = shop_data.get(self.item_id)
-        
+        await self.purchase(interaction, self.item_id)
+
+    @staticmethod
+    async def purchase(interaction: discord.Interaction, item_id):
+        """Handle a purchase click for one item, from a listing or the /shop browser."""
+        if interaction.guild is None:
+            # Roles and ticket notifications need a server
+            return await interaction.response.send_message(
+                "❌ Purchases can only be made in a server",
+                ephemeral=True
+            )
+        shop = interaction.client.get_cog("Shop")
+        item = shop.catalog.get(item_id) if shop else None
+
         if not item:
             return await interaction.response.send_message(
                 "❌ This item is no longer available", 
                 ephemeral=True
             )
+        if item.get('stock') == 0:
+            return await interaction.response.send_message("❌ This item is sold out", ephemeral=True)
 
         user_id = str(interaction.user.id)
         price = item['price']
         role_id = item.get('role_id')
 
-        if get_balance(user_id) < price:
+        role = interaction.guild.get_role(role_id) if role_id else None
+        if role and role in interaction.user.roles:
             return await interaction.response.send_message(
-                f"❌ You need {price - get_balance(user_id)} more smiles!",
+                "❌ You already own this role",
                 ephemeral=True
             )
 
-        change_balance(user_id, -price)
+        # Stock, debit and (for non-role items) the ticket are one transaction.
+        # Role purchases reference the item, everything else the ticket it opens
+        ticket_id = None if role else f"ticket_{interaction.id}"
+        status, balance, stock = await purchase_item_async(
+            item_id, user_id, str(interaction.user), ticket_id
+        )
+        if status == "gone":
+            return await interaction.response.send_message(
+                "❌ This item is no longer available",
+                ephemeral=True
+            )
+        if status == "sold_out":
+            shop.update_stock(item_id, 0)
+            return await interaction.response.send_message("❌ This item is sold out", ephemeral=True)
+        if status == "funds":
+            return await interaction.response.send_message(
+                f"❌ You need {price - balance} more smiles!",
+                ephemeral=True
+            )
+        shop.update_stock(item_id, stock)
 
-        if role_id:
-            role = interaction.guild.get_role(role_id)
-            if role:
-                if role in interaction.user.roles:
-                    return await interaction.response.send_message(
-                        "❌ You already own this role",
-                        ephemeral=True
-                    )
+        if role:
+            try:
                 await interaction.user.add_roles(role)
-                await interaction.response.send_message(
-                    f"✅ Purchased **{item['title']}** for {price} smiles!",
+            except discord.HTTPException:
+                stock = await refund_purchase_async(item_id, user_id, price)
+                shop.update_stock(item_id, stock, restocked=True)
+                return await interaction.response.send_message(
+                    "❌ Couldn't assign the role, your smiles were refunded",
                     ephemeral=True
                 )
-                return
-
-        # No role - create ticket
-        tickets = load_data(TICKETS_FILE)
-        ticket_id = f"ticket_{interaction.id}"
-        
-        tickets[ticket_id] = {
-            "user_id": user_id,
-            "username": str(interaction.user),
-            "item": item['title'],
-            "price": price,
-            "status": "open",
-            "timestamp": str(discord.utils.utcnow())
-        }
-        save_data(TICKETS_FILE, tickets)
+            await interaction.response.send_message(
+                f"✅ Purchased **{item['title']}** for {price} smiles!",
+                ephemeral=True
+            )
+            return
 
         # Notify in tickets channel
         channel = interaction.guild.get_channel(TICKETS_CHANNEL_ID)
@@ -108,9 +159,176 @@ class ShopItemView(discord.ui.View):
         super().__init__(timeout=None)
         self.add_item(BuyButton(item_id))
 
+
+class CatalogPages:
+    """Rendered /shop pages, built the first time each is viewed.
+
+    Everything is dropped when the catalog version changes. Stock changes
+    don't bump the version, so a sale drops just the page showing that item.
+    """
+
+    def __init__(self, catalog, page_size=CATALOG_PAGE_SIZE):
+        self.catalog = catalog
+        self.page_size = page_size
+        self._version = None
+        self._order = []
+        self._position = {}
+        self._pages = {}  # page index -> (embed payload, item ids)
+
+    def _sync(self):
+        if self._version != self.catalog.version:
+            self._version = self.catalog.version
+            self._order = list(self.catalog.items)
+            self._position = {item_id: i for i, item_id in enumerate(self._order)}
+            self._pages = {}
+
+    def page_count(self):
+        self._sync()
+        return -(-len(self._order) // self.page_size)
+
+    def get(self, index):
+        """(embed, item ids) for one page."""
+        self._sync()
+        page = self._pages.get(index)
+        if page is None:
+            item_ids = self._order[index * self.page_size:(index + 1) * self.page_size]
+            page = (self._build(index, item_ids).to_dict(), item_ids)
+            self._pages[index] = page
+        return discord.Embed.from_dict(page[0]), page[1]
+
+    def invalidate_item(self, item_id):
+        position = self._position.get(item_id)
+        if position is not None:
+            self._pages.pop(position // self.page_size, None)
+
+    def _build(self, index, item_ids):
+        embed = discord.Embed(title="🛍️ Shop", color=discord.Color.gold())
+        for item_id in item_ids:
+            item = self.catalog.get(item_id)
+            lines = [item['description'][:200]] if item.get('description') else []
+            if item.get('role_id'):
+                lines.append(f"**Role:** <@&{item['role_id']}>")
+            if item.get('stock') is not None:
+                lines.append(f"**Stock:** {item['stock']} left" if item['stock'] > 0 else "**Sold out**")
+            embed.add_field(
+                name=f"{item['title']} · {item['price']} smiles",
+                value="\n".join(lines) or "\u200b",
+                inline=False
+            )
+        embed.set_footer(text=f"Page {index + 1}/{max(self.page_count(), 1)} · {len(self._order)} item(s)")
+        return embed
+
+
+class CatalogView(KeysetPaginator):
+    """A /shop browser: pages come from CatalogPages, with a buy button per item.
+
+    The page index is the cursor. Buy buttons are plain buttons calling
+    BuyButton.purchase, the handler behind the posted listings. They must not
+    be BuyButtons: when this view times out, discord.py unregisters every
+    dynamic item class found in it, which would break every listing.
+    """
+
+    def __init__(self, pages, owner_id):
+        super().__init__(self.load_catalog_page, owner_id=owner_id)
+        self.pages = pages
+        self.buy_buttons = []
+
+    async def load_catalog_page(self, after):
+        count = self.pages.page_count()
+        index = min(after or 0, max(count - 1, 0))  # the catalog may have shrunk
+        embed, item_ids = self.pages.get(index)
+
+        for button in self.buy_buttons:
+            self.remove_item(button)
+        self.buy_buttons = []
+        for item_id in item_ids:
+            item = self.pages.catalog.get(item_id)
+            button = discord.ui.Button(
+                style=discord.ButtonStyle.green,
+                label=f"Buy {item['title']}"[:80],
+                row=1,
+                disabled=item.get('stock') == 0
+            )
+            button.callback = functools.partial(BuyButton.purchase, item_id=item_id)
+            self.buy_buttons.append(button)
+            self.add_item(button)
+
+        return embed, index + 1 if index + 1 < count else None
+
 class Shop(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.catalog = ShopCatalog()
+        self.catalog_pages = CatalogPages(self.catalog)
+        self.stock_updaters = {}  # item id -> CoalescedUpdater for the posted listing
+
+    async def cog_load(self):
+        await self.catalog.load()
+        self.bot.add_dynamic_items(BuyButton)
+        self.check_catalog.start()
+        self.archive_tickets.start()
+
+    async def cog_unload(self):
+        self.check_catalog.cancel()
+        self.archive_tickets.cancel()
+        self.bot.remove_dynamic_items(BuyButton)
+        for updater in self.stock_updaters.values():
+            updater.cancel()
+
+    def update_stock(self, item_id, stock, restocked=False):
+        """Record an item's stock after a purchase and schedule a listing redraw."""
+        if stock is None:
+            return
+        if restocked:
+            self.catalog.set_stock(item_id, stock)
+        else:
+            self.catalog.note_stock_taken(item_id, stock)
+        self.catalog_pages.invalidate_item(item_id)
+        updater = self.stock_updaters.get(item_id)
+        if updater is None:
+            updater = CoalescedUpdater(lambda: self._redraw_listing(item_id), window=STOCK_REDRAW_WINDOW)
+            self.stock_updaters[item_id] = updater
+        updater.request()
+
+    async def _redraw_listing(self, item_id):
+        item = self.catalog.get(item_id)
+        if item and item.get('channel_id') and item.get('message_id'):
+            channel = self.bot.get_partial_messageable(item['channel_id'])
+            await channel.get_partial_message(item['message_id']).edit(embed=build_item_embed(item))
+
+    @tasks.loop(seconds=CATALOG_CHECK_INTERVAL)
+    async def check_catalog(self):
+        """Pick up catalog edits made outside the bot"""
+        try:
+            await self.catalog.check()
+        except Exception as e:
+            print(f"❌ Failed to check shop catalog: {e}")
+
+    @tasks.loop(hours=24)
+    async def archive_tickets(self):
+        """Move long-closed tickets out of the hot table, one batch at a time"""
+        try:
+            cutoff = archive_cutoff(TICKET_ARCHIVE_DAYS)
+            moved = 0
+            while True:
+                batch = await archive_closed_tickets_async(cutoff)
+                moved += batch
+                if batch < ARCHIVE_BATCH:
+                    break
+            if moved:
+                print(f"✅ Archived {moved} closed shop ticket(s)")
+        except Exception as e:
+            print(f"❌ Failed to archive shop tickets: {e}")
+
+    @app_commands.command(name="shop", description="Browse the shop")
+    @app_commands.guild_only()
+    async def shop(self, interaction: discord.Interaction):
+        if not self.catalog.items:
+            return await interaction.response.send_message("ℹ️ The shop is empty.", ephemeral=True)
+
+        view = CatalogView(self.catalog_pages, interaction.user.id)
+        embed = await view.start()
+        await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
 
     @app_commands.command(name="create_shop_item", description="Create a new shop listing")
     @app_commands.describe(
@@ -118,7 +336,8 @@ class Shop(commands.Cog):
         description="Item description",
         price="Price in smiles",
         role="Role ID or name (optional)",
-        image="Optional banner image (attach file)"
+        image="Optional banner image (attach file)",
+        stock="How many can be sold (optional, unlimited if empty)"
     )
     async def create_shop_item(
         self,
@@ -127,7 +346,8 @@ class Shop(commands.Cog):
         description: str,
         price: int,
         role: str = None,
-        image: Optional[discord.Attachment] = None
+        image: Optional[discord.Attachment] = None,
+        stock: Optional[int] = None
     ):
         if not interaction.user.guild_permissions.administrator:
             return await interaction.response.send_message(
@@ -145,33 +365,28 @@ class Shop(commands.Cog):
                 )
             role_id = resolved_role.id
 
+        if stock is not None and stock < 1:
+            return await interaction.response.send_message(
+                "❌ Stock must be at least 1",
+                ephemeral=True
+            )
+
         item_id = f"item_{interaction.id}"
-        shop_data = load_data(SHOP_DATA_FILE)
-        
-        shop_data[item_id] = {
+        item = {
             "title": title,
             "description": description,
             "price": price,
             "role_id": role_id,
-            "image_url": image.url if image else None
+            "image_url": image.url if image else None,
+            "stock": stock
         }
-        save_data(SHOP_DATA_FILE, shop_data)
+        await self.catalog.add(item_id, item)
 
-        embed = discord.Embed(
-            title=f"\n",
-            description=f"# **🛍️ {title}**",
-            color=discord.Color.gold()
-        )
-        embed.add_field(name="**Price**", value=f"**{price} smiles**")
-        if role_id:
-            embed.add_field(name="**Role**", value=f"<@&{role_id}>")
-        if image:
-            embed.set_image(url=image.url)
-
-        await interaction.channel.send(
-            embed=embed,
+        message = await interaction.channel.send(
+            embed=build_item_embed(item),
             view=ShopItemView(item_id)
         )
+        await self.catalog.set_message(item_id, message.channel.id, message.id)
         await interaction.response.send_message(
             "✅ Shop item created!",
             ephemeral=True
@@ -186,33 +401,43 @@ class Shop(commands.Cog):
                 ephemeral=True
             )
 
-        tickets = load_data(TICKETS_FILE)
-        open_tickets = {k: v for k, v in tickets.items() if v['status'] == 'open'}
-
-        if not open_tickets:
+        total = await count_open_tickets_async()
+        if not total:
             return await interaction.response.send_message(
                 "ℹ️ No open tickets found.",
                 ephemeral=True
             )
 
+        async def load_page(after):
+            rows = await get_open_tickets_async(TICKET_PAGE_SIZE + 1, after)
+            rows, next_after = split_page(rows, TICKET_PAGE_SIZE, lambda t: (t['created_at'], t['rowid']))
+            return self.build_tickets_embed(rows, total), next_after
+
+        view = KeysetPaginator(load_page, owner_id=interaction.user.id)
+        embed = await view.start()
+        await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
+
+    def build_tickets_embed(self, open_tickets, total):
         embed = discord.Embed(
             title="📝 Open Shop Tickets",
             color=discord.Color.blue()
         )
+        embed.set_footer(text=f"{total} open ticket(s), oldest first")
+        if not open_tickets:
+            embed.description = "No more open tickets."
 
-        for ticket_id, data in open_tickets.items():
+        for data in open_tickets:
             embed.add_field(
-                name=f"Ticket {ticket_id}",
+                name=f"Ticket {data['ticket_id']}",
                 value=(
                     f"**User:** {data['username']}\n"
                     f"**Item:** {data['item']}\n"
                     f"**Price:** {data['price']} smiles\n"
-                    f"**Date:** {data['timestamp']}"
+                    f"**Date:** <t:{data['created_at']}:f>"
                 ),
                 inline=False
             )
-
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return embed
 
     @app_commands.command(name="close_shop_ticket", description="Close a shop ticket")
     @app_commands.describe(
@@ -231,11 +456,8 @@ class Shop(commands.Cog):
                 ephemeral=True
             )
 
-        tickets = load_data(TICKETS_FILE)
-        user_tickets = {
-            k: v for k, v in tickets.items() 
-            if v['user_id'] == str(user.id) and v['status'] == 'open'
-        }
+        # Close all open tickets for this user
+        user_tickets = await close_user_tickets_async(user.id, str(interaction.user), notes)
 
         if not user_tickets:
             return await interaction.response.send_message(
@@ -243,16 +465,6 @@ class Shop(commands.Cog):
                 ephemeral=True
             )
 
-        # Close all open tickets for this user
-        for ticket_id in user_tickets:
-            tickets[ticket_id]['status'] = 'closed'
-            tickets[ticket_id]['closed_by'] = str(interaction.user)
-            tickets[ticket_id]['closed_at'] = str(discord.utils.utcnow())
-            if notes:
-                tickets[ticket_id]['notes'] = notes
-
-        save_data(TICKETS_FILE, tickets)
-
         embed = discord.Embed(
             title="✅ Ticket Closed",
             description=f"Closed {len(user_tickets)} ticket(s) for {user.mention}",
@@ -273,6 +485,64 @@ class Shop(commands.Cog):
         except discord.Forbidden:
             pass
 
+    @app_commands.command(name="search_ticket_archive", description="Search archived shop tickets")
+    @app_commands.describe(
+        user="Only tickets bought by this user",
+        text="Text in the ticket ID, item, username or notes",
+        month="Purchase month as YYYY-MM"
+    )
+    async def search_ticket_archive(
+        self,
+        interaction: discord.Interaction,
+        user: Optional[discord.User] = None,
+        text: Optional[str] = None,
+        month: Optional[str] = None
+    ):
+        if not interaction.user.guild_permissions.administrator:
+            return await interaction.response.send_message(
+                "❌ Administrator permission required",
+                ephemeral=True
+            )
+        if month and not re.fullmatch(r"\d{4}-\d{2}", month):
+            return await interaction.response.send_message(
+                "❌ Month must look like 2025-08",
+                ephemeral=True
+            )
+
+        await interaction.response.defer(ephemeral=True)
+
+        async def load_page(after):
+            tickets, next_after = await search_archive_async(
+                user.id if user else None, text, month, after, TICKET_PAGE_SIZE
+            )
+            return self.build_archive_embed(tickets), next_after
+
+        view = KeysetPaginator(load_page, owner_id=interaction.user.id)
+        embed = await view.start()
+        await interaction.followup.send(embed=embed, view=view, ephemeral=True)
+
+    def build_archive_embed(self, tickets):
+        embed = discord.Embed(
+            title="🗄️ Archived Shop Tickets",
+            color=discord.Color.dark_grey()
+        )
+        if not tickets:
+            embed.description = "No matching tickets."
+
+        for data in tickets:
+            closed = f"<t:{data['closed_at']}:d>" if data.get('closed_at') else "unknown"
+            embed.add_field(
+                name=f"Ticket {data['ticket_id']}",
+                value=(
+                    f"**User:** {data['username']} (`{data['user_id']}`)\n"
+                    f"**Item:** {data['item']} · {data['price']} smiles\n"
+                    f"**Bought:** <t:{data['created_at']}:d> · **Closed:** {closed} by {data.get('closed_by') or 'unknown'}"
+                    + (f"\n**Notes:** {data['notes'][:200]}" if data.get('notes') else "")
+                ),
+                inline=False
+            )
+        return embed
+
     async def resolve_role(self, guild: discord.Guild, role_input: str) -> Optional[discord.Role]:
         """Resolve role from ID or name"""
         try:
@@ -286,11 +556,5 @@ class Shop(commands.Cog):
         except ValueError:
             return None
 
-    @commands.Cog.listener()
-    async def on_ready(self):
-        # Register persistent views
-        for item_id in load_data(SHOP_DATA_FILE):
-            self.bot.add_view(ShopItemView(item_id))
-
 async def setup(bot):
     await bot.add_cog(Shop(bot))
\ No newline at end of file
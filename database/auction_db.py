@@ -0,0 +1,378 @@
+import json
+import os
+import time
+from datetime import datetime
+
+from database.coin_db import transaction, fetch_all, credit_in, debit_in, note_balance_change, get_balance
+
+AUCTION_FILE = "database/current_auction.json"
+WIN_TRACKER_FILE = "database/win_tracker.json"
+BID_INCREMENT = 1  # how far a proxy bid goes over the bid it answers
+
+_AUCTION_COLUMNS = (
+    "id", "item", "description", "end_time", "highest_bid", "highest_bidder", "minimum_bid",
+    "image_url", "banner_url", "thread_id", "channel_id", "message_id", "status"
+)
+_EDITABLE = set(_AUCTION_COLUMNS) - {"id", "status", "highest_bid", "highest_bidder"}
+
+
+def init_auction_db():
+    with transaction() as c:
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS auctions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                item TEXT NOT NULL,
+                description TEXT,
+                end_time TEXT NOT NULL,
+                highest_bid INTEGER NOT NULL DEFAULT 0,
+                highest_bidder TEXT,
+                minimum_bid INTEGER NOT NULL DEFAULT 0,
+                image_url TEXT,
+                banner_url TEXT,
+                thread_id INTEGER,
+                channel_id INTEGER,
+                message_id INTEGER,
+                status TEXT NOT NULL DEFAULT 'active',
+                created_at INTEGER NOT NULL
+            )
+        ''')
+        c.execute("CREATE INDEX IF NOT EXISTS idx_auctions_status ON auctions (status)")
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS bids (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                auction_id INTEGER NOT NULL,
+                user_id TEXT NOT NULL,
+                amount INTEGER NOT NULL,
+                ts INTEGER NOT NULL
+            )
+        ''')
+        c.execute("CREATE INDEX IF NOT EXISTS idx_bids_auction ON bids (auction_id, amount)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_bids_user ON bids (user_id, auction_id)")
+        # Wins per user per calendar month, so the 4-wins limit resets on its own.
+        # Names are stored lowercased for /resetauctionwins lookups.
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS auction_wins_monthly (
+                user_id TEXT NOT NULL,
+                month TEXT NOT NULL,
+                wins INTEGER NOT NULL DEFAULT 0,
+                username TEXT,
+                display_name TEXT,
+                PRIMARY KEY (user_id, month)
+            )
+        ''')
+        c.execute("CREATE INDEX IF NOT EXISTS idx_wins_username ON auction_wins_monthly (month, username)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_wins_display_name ON auction_wins_monthly (month, display_name)")
+        # Smiles taken from bidders and not yet spent or refunded
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS auction_escrow (
+                auction_id INTEGER NOT NULL,
+                user_id TEXT NOT NULL,
+                amount INTEGER NOT NULL,
+                PRIMARY KEY (auction_id, user_id)
+            )
+        ''')
+    import_json_state()
+
+
+def import_json_state():
+    """One-time import of the old JSON auction and win tracker files.
+
+    Each file is renamed to *.imported afterwards so it is never read again.
+    """
+    if os.path.exists(AUCTION_FILE):
+        with open(AUCTION_FILE, "r") as f:
+            auction = json.load(f)
+        if auction and not get_active_auctions():
+            auction_id = create_auction(auction)
+            if auction.get("highest_bidder"):
+                with transaction() as c:
+                    c.execute(
+                        "INSERT INTO bids (auction_id, user_id, amount, ts) VALUES (?, ?, ?, ?)",
+                        (auction_id, str(auction["highest_bidder"]), auction["highest_bid"], int(time.time()))
+                    )
+                    c.execute(
+                        "UPDATE auctions SET highest_bid = ?, highest_bidder = ? WHERE id = ?",
+                        (auction["highest_bid"], str(auction["highest_bidder"]), auction_id)
+                    )
+                    c.execute(
+                        "INSERT INTO auction_escrow (auction_id, user_id, amount) VALUES (?, ?, ?)",
+                        (auction_id, str(auction["highest_bidder"]), auction["highest_bid"])
+                    )
+        os.replace(AUCTION_FILE, AUCTION_FILE + ".imported")
+
+    if os.path.exists(WIN_TRACKER_FILE):
+        with open(WIN_TRACKER_FILE, "r") as f:
+            wins = json.load(f)
+        with transaction() as c:
+            c.executemany(
+                "INSERT INTO auction_wins_monthly (user_id, month, wins) VALUES (?, ?, ?) "
+                "ON CONFLICT(user_id, month) DO UPDATE SET wins = excluded.wins",
+                [(str(uid), current_month(), count) for uid, count in wins.items()]
+            )
+        os.replace(WIN_TRACKER_FILE, WIN_TRACKER_FILE + ".imported")
+
+
+def _row_to_auction(row):
+    return dict(zip(_AUCTION_COLUMNS, row)) if row else None
+
+
+def get_active_auctions():
+    rows = fetch_all(
+        f"SELECT {', '.join(_AUCTION_COLUMNS)} FROM auctions WHERE status = 'active' ORDER BY id"
+    )
+    return [_row_to_auction(row) for row in rows]
+
+
+def create_auction(auction):
+    """Insert a new active auction and return its id."""
+    with transaction() as c:
+        c.execute('''
+            INSERT INTO auctions (item, description, end_time, minimum_bid, image_url, banner_url,
+                                  thread_id, channel_id, message_id, status, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 'active', ?)
+        ''', (
+            auction["item"], auction.get("description"), auction["end_time"], auction.get("minimum_bid", 0),
+            auction.get("image_url"), auction.get("banner_url"), auction.get("thread_id"),
+            auction.get("channel_id"), auction.get("message_id"), int(time.time())
+        ))
+        return c.lastrowid
+
+
+def update_auction(auction_id, **fields):
+    """Update editable auction columns (item, description, end_time, images, message ids...)."""
+    fields = {k: v for k, v in fields.items() if k in _EDITABLE}
+    if not fields:
+        return
+    assignments = ", ".join(f"{column} = ?" for column in fields)
+    with transaction() as c:
+        c.execute(f"UPDATE auctions SET {assignments} WHERE id = ?", (*fields.values(), auction_id))
+
+
+def place_bid(auction_id, user_id, amount, max_amount=None):
+    """Resolve a bid against the current leader, all in one transaction.
+
+    amount is the bid to place now, or None for the lowest bid that would
+    lead. A higher max_amount makes it a proxy bid: the engine bids for the
+    user, one increment at a time, up to that maximum whenever someone
+    challenges them, so a bidding war collapses into a single state change.
+
+    The leader's escrow holds their maximum. A challenger only takes the
+    lead by beating it, and the previous leader's hold is refunded; otherwise
+    the leader's proxy answers and the price rises without changing hands.
+    Returns one of
+      ("lead", price, (outbid_user_id, refund) or None)
+      ("beaten", price, None)  - the leader's maximum was at least as high
+      ("low", price, None)     - the bid doesn't beat the current price
+      ("funds", balance, None) - balance (including their hold) is too low
+    """
+    uid, ref = str(user_id), str(auction_id)
+    now = int(time.time())
+    with transaction() as c:
+        row = c.execute(
+            "SELECT highest_bid, highest_bidder, minimum_bid FROM auctions WHERE id = ? AND status = 'active'",
+            (auction_id,)
+        ).fetchone()
+        if row is None:
+            return "low", None, None
+        price, leader, minimum = row
+        lowest = max(minimum, price + BID_INCREMENT)
+        if amount is not None and amount < lowest:
+            return "low", price, None
+        floor = lowest if amount is None else amount
+        ceiling = max(floor, max_amount or 0)
+
+        holds = dict(c.execute(
+            "SELECT user_id, amount FROM auction_escrow WHERE auction_id = ? AND user_id IN (?, ?)",
+            (auction_id, uid, leader)
+        ).fetchall())
+        held = holds.get(uid, 0)
+        leader_max = holds.get(leader, price)
+
+        if uid == leader:
+            # Leader raising their own bid or maximum
+            new_max = max(ceiling, leader_max)
+            new_price = price if amount is None else amount
+        elif leader and ceiling <= leader_max:
+            # The leader's proxy answers; ties go to whoever got there first
+            # Nothing is debited, but the bid has to be one they could pay
+            available = get_balance(uid) + held
+            if available < ceiling:
+                return "funds", available, None
+            new_price = min(leader_max, ceiling + BID_INCREMENT)
+            c.execute("UPDATE auctions SET highest_bid = ? WHERE id = ?", (new_price, auction_id))
+            c.executemany(
+                "INSERT INTO bids (auction_id, user_id, amount, ts) VALUES (?, ?, ?, ?)",
+                [(auction_id, uid, ceiling, now), (auction_id, leader, new_price, now)]
+            )
+            return "beaten", new_price, None
+        else:
+            new_max = ceiling
+            new_price = max(floor, min(ceiling, leader_max + BID_INCREMENT)) if leader else floor
+
+        if new_max > held:
+            # Only the extra hold is taken; a leader within their maximum pays nothing more
+            paid, balance = debit_in(c, uid, new_max - held, "auction", ref)
+            if not paid:
+                return "funds", balance + held, None
+
+        c.execute('''
+            INSERT INTO auction_escrow (auction_id, user_id, amount) VALUES (?, ?, ?)
+            ON CONFLICT(auction_id, user_id) DO UPDATE SET amount = excluded.amount
+        ''', (auction_id, uid, new_max))
+        c.execute(
+            "UPDATE auctions SET highest_bid = ?, highest_bidder = ? WHERE id = ?", (new_price, uid, auction_id)
+        )
+        if new_price != price or uid != leader:
+            c.execute(
+                "INSERT INTO bids (auction_id, user_id, amount, ts) VALUES (?, ?, ?, ?)",
+                (auction_id, uid, new_price, now)
+            )
+
+        outbid = None
+        if leader and leader != uid:
+            refund = c.execute(
+                "DELETE FROM auction_escrow WHERE auction_id = ? AND user_id = ? RETURNING amount",
+                (auction_id, leader)
+            ).fetchone()
+            if refund:
+                credit_in(c, leader, refund[0], "auction", ref)
+                outbid = (leader, refund[0])
+        return "lead", new_price, outbid
+
+
+def settle_auction(auction_id, status="ended", names=None):
+    """Close an auction and release its escrow in one transaction.
+
+    An ended auction takes the final price out of the winner's hold and
+    counts their win; every other hold, and whatever the winner held above
+    the price, is refunded with one set-based update. A cancelled
+    auction refunds everyone. names maps user ids to (username, display_name)
+    for the win record. Returns (winner_id or None, [(user_id, refund)]),
+    or (None, []) if the auction was already closed.
+    """
+    ref = str(auction_id)
+    with transaction() as c:
+        row = c.execute(
+            "UPDATE auctions SET status = ? WHERE id = ? AND status = 'active' RETURNING highest_bidder, highest_bid",
+            (status, auction_id)
+        ).fetchone()
+        if row is None:
+            return None, []
+        winner = row[0] if status == "ended" else None
+
+        if winner:
+            # The winner pays the final price; anything above it (a proxy maximum) goes back
+            c.execute(
+                "UPDATE auction_escrow SET amount = amount - ? WHERE auction_id = ? AND user_id = ?",
+                (row[1], auction_id, winner)
+            )
+
+        now = int(time.time())
+        c.execute('''
+            UPDATE SMILES SET balance = SMILES.balance + e.amount
+            FROM auction_escrow e
+            WHERE e.auction_id = ? AND e.user_id = SMILES.user_id AND e.amount > 0
+        ''', (auction_id,))
+        refunds = c.execute('''
+            INSERT INTO ledger (user_id, delta, balance, reason, ref_id, ts)
+            SELECT e.user_id, e.amount, s.balance, 'auction', ?, ?
+            FROM auction_escrow e JOIN SMILES s ON s.user_id = e.user_id
+            WHERE e.auction_id = ? AND e.amount > 0
+            RETURNING user_id, delta, balance
+        ''', (ref, now, auction_id)).fetchall()
+        for user_id, _, balance in refunds:
+            note_balance_change(user_id, balance)
+        c.execute("DELETE FROM auction_escrow WHERE auction_id = ?", (auction_id,))
+
+        if winner:
+            username, display_name = _lower_names((names or {}).get(winner))
+            c.execute('''
+                INSERT INTO auction_wins_monthly (user_id, month, wins, username, display_name)
+                VALUES (?, ?, 1, ?, ?)
+                ON CONFLICT(user_id, month) DO UPDATE SET
+                    wins = wins + 1,
+                    username = COALESCE(excluded.username, username),
+                    display_name = COALESCE(excluded.display_name, display_name)
+            ''', (winner, current_month(), username, display_name))
+        return winner, [(user_id, delta) for user_id, delta, _ in refunds]
+
+
+def load_escrow():
+    """(auction_id, user_id, amount) for every hold on an active auction."""
+    return fetch_all('''
+        SELECT e.auction_id, e.user_id, e.amount
+        FROM auction_escrow e JOIN auctions a ON a.id = e.auction_id
+        WHERE a.status = 'active'
+    ''')
+
+
+def get_active_bidders():
+    """(auction_id, user_id) for everyone who has bid on an active auction."""
+    return fetch_all('''
+        SELECT DISTINCT b.auction_id, b.user_id
+        FROM bids b JOIN auctions a ON a.id = b.auction_id
+        WHERE a.status = 'active'
+    ''')
+
+
+def current_month():
+    return datetime.utcnow().strftime("%Y-%m")
+
+
+def _lower_names(names):
+    if not names:
+        return None, None
+    return tuple(name.lower() if name else None for name in names)
+
+
+def get_month_wins(month=None):
+    """{user_id: wins} for one month (default: this one)."""
+    return dict(fetch_all(
+        "SELECT user_id, wins FROM auction_wins_monthly WHERE month = ? AND wins > 0",
+        (month or current_month(),)
+    ))
+
+
+def get_unnamed_winners(month=None):
+    """User ids with a win row this month but no stored names, e.g. rows
+    carried over from the old win tracker."""
+    return [user_id for (user_id,) in fetch_all(
+        "SELECT user_id FROM auction_wins_monthly WHERE month = ? AND username IS NULL",
+        (month or current_month(),)
+    )]
+
+
+def set_win_names(names, month=None):
+    """Store {user_id: (username, display name)} on this month's win rows."""
+    month = month or current_month()
+    with transaction() as c:
+        c.executemany(
+            "UPDATE auction_wins_monthly SET username = ?, display_name = ? WHERE month = ? AND user_id = ?",
+            [(*_lower_names(pair), month, str(user_id)) for user_id, pair in names.items()]
+        )
+
+
+def reset_wins(user_id=None, name=None):
+    """Reset this month's win counter for everyone, one user id, or whoever
+    has the given username or display name (case-insensitive).
+
+    Returns [(user_id, display_name)] for the rows reset by id or name.
+    """
+    month = current_month()
+    with transaction() as c:
+        if user_id is None and name is None:
+            c.execute("DELETE FROM auction_wins_monthly WHERE month = ?", (month,))
+            return []
+        if user_id is not None:
+            return c.execute(
+                "UPDATE auction_wins_monthly SET wins = 0 WHERE month = ? AND user_id = ? "
+                "RETURNING user_id, display_name",
+                (month, str(user_id))
+            ).fetchall()
+        name = name.lower()
+        return c.execute(
+            "UPDATE auction_wins_monthly SET wins = 0 "
+            "WHERE (month = ? AND username = ?) OR (month = ? AND display_name = ?) "
+            "RETURNING user_id, display_name",
+            (month, name, month, name)
+        ).fetchall()
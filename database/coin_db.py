@@ -1,91 +1,602 @@
 import sqlite3
 import os
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
 
 DB_FILE = "database/coin_data.db"
 
+# A single long-lived connection is shared by every caller. The async wrappers
+# run all work on one dedicated thread so the event loop never waits on disk;
+# the lock only matters for scripts that call the sync functions directly.
+_conn = None
+_lock = threading.RLock()
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="coin-db")
+
+# Write-behind buffer for the 1-smile-per-message path: user_id -> unflushed delta.
+EARN_FLUSH_SIZE = 500
+_pending = {}
+_pending_lock = threading.Lock()
+
+# Callbacks told about committed balance changes as a list of (user_id, balance).
+# They run on whichever thread committed, so they must be thread-safe and fast.
+_balance_listeners = []
+_in_txn = False
+_txn_changes = []
+_txn_absorbed = []  # (user_id, delta) taken from _pending by the open transaction
+
+_ADD_BALANCE_SQL = (
+    "INSERT INTO SMILES (user_id, balance) VALUES (?, ?) "
+    "ON CONFLICT(user_id) DO UPDATE SET balance = balance + excluded.balance"
+)
+
+# Ledger reason codes: message, earn, daily, trivia, cointoss, shop, auction,
+# admin_give, and adjust/set for anything else. Buffered message earnings are
+# written as one aggregated row per user per flush.
+_LEDGER_SQL = "INSERT INTO ledger (user_id, delta, balance, reason, ref_id, ts) VALUES (?, ?, ?, ?, ?, ?)"
+_LEDGER_AFTER_ADD_SQL = (
+    "INSERT INTO ledger (user_id, delta, balance, reason, ref_id, ts) "
+    "SELECT user_id, ?, balance, ?, NULL, ? FROM SMILES WHERE user_id = ?"
+)
+
+
+def get_connection():
+    """Return the shared connection, opening it in WAL mode on first use."""
+    global _conn
+    with _lock:
+        if _conn is None:
+            os.makedirs(os.path.dirname(DB_FILE) or ".", exist_ok=True)
+            conn = sqlite3.connect(DB_FILE, check_same_thread=False, cached_statements=256)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            _conn = conn
+        return _conn
+
+
+def close_db():
+    """Flush buffered earnings, then commit and close the shared connection."""
+    global _conn
+    with _lock:
+        if _conn is not None:
+            flush_pending()
+            _conn.commit()
+            _conn.close()
+            _conn = None
+
+
+@contextmanager
+def transaction():
+    """Yield a cursor whose statements are committed together (or rolled back).
+
+    Transactions don't nest: inside one, use the *_in helpers on its cursor
+    instead of calling functions that open their own. Balance changes noted
+    inside are handed to the balance listeners once it has committed.
+    Buffered earnings absorbed inside go back into the buffer if it rolls back.
+    """
+    global _in_txn
+    with _lock:
+        if _in_txn:
+            raise RuntimeError("transaction() is already open on this connection")
+        conn = get_connection()
+        _in_txn = True
+        try:
+            with conn:
+                yield conn.cursor()
+        except BaseException:
+            _txn_changes.clear()
+            _requeue_absorbed()
+            raise
+        finally:
+            _in_txn = False
+        _txn_absorbed.clear()
+        if _txn_changes:
+            changes = _txn_changes[:]
+            _txn_changes.clear()
+            for callback in list(_balance_listeners):
+                try:
+                    callback(changes)
+                except Exception as e:
+                    print(f"❌ Balance listener failed: {e}")
+
+
+def add_balance_listener(callback):
+    _balance_listeners.append(callback)
+
+def remove_balance_listener(callback):
+    if callback in _balance_listeners:
+        _balance_listeners.remove(callback)
+
+def note_balance_change(user_id, balance):
+    """Record a new stored balance written in the current transaction."""
+    if _balance_listeners:
+        _txn_changes.append((str(user_id), balance))
+
+
+def fetch_one(sql, params=()):
+    with _lock:
+        return get_connection().execute(sql, params).fetchone()
+
+
+def fetch_all(sql, params=()):
+    with _lock:
+        return get_connection().execute(sql, params).fetchall()
+
+
+async def run_db(func, *args, **kwargs):
+    """Run a blocking database call on the dedicated database thread."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+
+
 def init_bid_tracking():
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS bid_tracker (
-            user_id TEXT,
-            month TEXT,
-            bid_count INTEGER,
-            PRIMARY KEY (user_id, month)
-        )
-    ''')
-    conn.commit()
-    conn.close()
+    with transaction() as c:
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS bid_tracker (
+                user_id TEXT,
+                month TEXT,
+                bid_count INTEGER,
+                PRIMARY KEY (user_id, month)
+            )
+        ''')
+
 def can_bid(user_id):
-    from datetime import datetime
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
     month = datetime.utcnow().strftime("%Y-%m")
-    c.execute("SELECT bid_count FROM bid_tracker WHERE user_id = ? AND month = ?", (str(user_id), month))
-    row = c.fetchone()
-    conn.close()
+    row = fetch_one("SELECT bid_count FROM bid_tracker WHERE user_id = ? AND month = ?", (str(user_id), month))
     return (row[0] if row else 0) < 4
 
 def increment_bid(user_id):
-    from datetime import datetime
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
     month = datetime.utcnow().strftime("%Y-%m")
-    c.execute('''
-        INSERT INTO bid_tracker (user_id, month, bid_count) VALUES (?, ?, 1)
-        ON CONFLICT(user_id, month) DO UPDATE SET bid_count = bid_count + 1
-    ''', (str(user_id), month))
-    conn.commit()
-    conn.close()
+    with transaction() as c:
+        c.execute('''
+            INSERT INTO bid_tracker (user_id, month, bid_count) VALUES (?, ?, 1)
+            ON CONFLICT(user_id, month) DO UPDATE SET bid_count = bid_count + 1
+        ''', (str(user_id), month))
+
+
+def init_ledger():
+    with transaction() as c:
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS ledger (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT NOT NULL,
+                delta INTEGER NOT NULL,
+                balance INTEGER NOT NULL,
+                reason TEXT NOT NULL,
+                ref_id TEXT,
+                ts INTEGER NOT NULL
+            )
+        ''')
+        c.execute("CREATE INDEX IF NOT EXISTS idx_ledger_user_ts ON ledger (user_id, ts)")
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS balance_snapshots (
+                user_id TEXT NOT NULL,
+                ledger_id INTEGER NOT NULL,
+                balance INTEGER NOT NULL,
+                ts INTEGER NOT NULL,
+                PRIMARY KEY (user_id, ledger_id)
+            )
+        ''')
+        # Balances that predate the ledger get an opening snapshot at ledger id 0
+        if (c.execute("SELECT 1 FROM balance_snapshots LIMIT 1").fetchone() is None
+                and c.execute("SELECT 1 FROM ledger LIMIT 1").fetchone() is None):
+            c.execute(
+                "INSERT INTO balance_snapshots (user_id, ledger_id, balance, ts) "
+                "SELECT user_id, 0, balance, ? FROM SMILES",
+                (int(time.time()),)
+            )
 
 
+def init_guild_members():
+    with transaction() as c:
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS guild_members (
+                guild_id TEXT NOT NULL,
+                user_id TEXT NOT NULL,
+                PRIMARY KEY (guild_id, user_id)
+            )
+        ''')
+        c.execute("CREATE INDEX IF NOT EXISTS idx_guild_members_user ON guild_members (user_id)")
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS guild_member_sync (
+                guild_id TEXT PRIMARY KEY,
+                synced_at INTEGER NOT NULL
+            )
+        ''')
+
+
+def init_cooldowns():
+    with transaction() as c:
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS cooldowns (
+                scope TEXT NOT NULL,
+                user_id TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                PRIMARY KEY (scope, user_id)
+            )
+        ''')
+        c.execute("CREATE INDEX IF NOT EXISTS idx_cooldowns_expires ON cooldowns (expires_at)")
 
 
 def init_db():
     os.makedirs("database", exist_ok=True)
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS SMILES (
-            user_id TEXT PRIMARY KEY,
-            balance INTEGER DEFAULT 0
-        )
-    ''')
-    conn.commit()
-    conn.close()
+    with transaction() as c:
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS SMILES (
+                user_id TEXT PRIMARY KEY,
+                balance INTEGER DEFAULT 0
+            )
+        ''')
+        c.execute("CREATE INDEX IF NOT EXISTS idx_smiles_balance ON SMILES (balance)")
     init_bid_tracking()
+    init_ledger()
+    init_guild_members()
+    init_cooldowns()
+
 
-    
 def get_balance(user_id):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("SELECT balance FROM SMILES WHERE user_id = ?", (str(user_id),))
-    row = c.fetchone()
-    conn.close()
-    return row[0] if row else 0
-
-def update_balance(user_id, new_balance):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute(
-        "INSERT INTO SMILES (user_id, balance) VALUES (?, ?) ON CONFLICT(user_id) DO UPDATE SET balance = ?",
-        (str(user_id), new_balance, new_balance)
-    )
-    conn.commit()
-    conn.close()
+    """Stored balance plus any earnings still waiting in the write-behind buffer."""
+    uid = str(user_id)
+    with _lock:
+        row = fetch_one("SELECT balance FROM SMILES WHERE user_id = ?", (uid,))
+        return (row[0] if row else 0) + pending_delta(uid)
+
+def update_balance(user_id, new_balance, reason="set", ref_id=None):
+    uid = str(user_id)
+    with transaction() as c:
+        _absorb_pending(c, uid)
+        row = c.execute("SELECT balance FROM SMILES WHERE user_id = ?", (uid,)).fetchone()
+        c.execute(
+            "INSERT INTO SMILES (user_id, balance) VALUES (?, ?) ON CONFLICT(user_id) DO UPDATE SET balance = ?",
+            (uid, new_balance, new_balance)
+        )
+        c.execute(_LEDGER_SQL, (uid, new_balance - (row[0] if row else 0), new_balance, reason, ref_id, int(time.time())))
+        note_balance_change(uid, new_balance)
 
-def change_balance(user_id, amount):
+def change_balance(user_id, amount, reason="adjust", ref_id=None):
     """Add or subtract SMILES. Use negative amount to subtract."""
-    current = get_balance(user_id)
-    new_balance = current + amount
-    update_balance(user_id, new_balance)
+    uid = str(user_id)
+    with transaction() as c:
+        return credit_in(c, uid, amount, reason, ref_id) + pending_delta(uid)
+
+def try_debit(user_id, amount, reason="adjust", ref_id=None):
+    """Subtract amount only if the balance covers it.
+
+    Returns (success, balance) where balance is the value after the debit,
+    or the unchanged balance when the user could not afford it.
+    """
+    with transaction() as c:
+        return debit_in(c, user_id, amount, reason, ref_id)
+
+def credit_in(c, user_id, amount, reason="adjust", ref_id=None):
+    """change_balance on a cursor from an open transaction(). Returns the stored balance."""
+    uid = str(user_id)
+    new_balance = c.execute(_ADD_BALANCE_SQL + " RETURNING balance", (uid, amount)).fetchone()[0]
+    c.execute(_LEDGER_SQL, (uid, amount, new_balance, reason, ref_id, int(time.time())))
+    note_balance_change(uid, new_balance)
     return new_balance
 
+def debit_in(c, user_id, amount, reason="adjust", ref_id=None):
+    """try_debit on a cursor from an open transaction(), so callers can debit
+    and write their own rows atomically. Returns (success, balance)."""
+    uid = str(user_id)
+    absorbed = _absorb_pending(c, uid)
+    row = c.execute(
+        "UPDATE SMILES SET balance = balance - ? WHERE user_id = ? AND balance >= ? RETURNING balance",
+        (amount, uid, amount)
+    ).fetchone()
+    if row:
+        c.execute(_LEDGER_SQL, (uid, -amount, row[0], reason, ref_id, int(time.time())))
+        note_balance_change(uid, row[0])
+        return True, row[0]
+    row = c.execute("SELECT balance FROM SMILES WHERE user_id = ?", (uid,)).fetchone()
+    if row and absorbed:
+        # Nothing was debited, but buffered earnings were written
+        note_balance_change(uid, row[0])
+    return False, row[0] if row else 0
+
 def get_top_balances(limit):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("SELECT user_id, balance FROM SMILES ORDER BY balance DESC LIMIT ?", (limit,))
-    top_users = c.fetchall()
-    conn.close()
-    return top_users
+    return fetch_all("SELECT user_id, balance FROM SMILES ORDER BY balance DESC LIMIT ?", (limit,))
+
+def get_rank(user_id):
+    """Global rank of a user, or None if they have no balance yet.
+
+    Ties share a rank (1, 1, 3), the same as Leaderboard.get_ranked_server_users,
+    so the rank is one more than the number of strictly higher balances. A user
+    whose only smiles are still buffered is ranked by the buffered amount.
+    """
+    uid = str(user_id)
+    with _lock:
+        if fetch_one("SELECT 1 FROM SMILES WHERE user_id = ?", (uid,)) is None and not pending_delta(uid):
+            return None
+        balance = get_balance(uid)
+        return fetch_one("SELECT COUNT(*) + 1 FROM SMILES WHERE balance > ?", (balance,))[0]
+
+
+def _absorb_pending(c, uid):
+    """Move one user's buffered earnings into the current transaction.
+
+    Returns the amount moved. transaction() puts it back if the
+    transaction rolls back.
+    """
+    with _pending_lock:
+        delta = _pending.pop(uid, 0)
+    if delta:
+        _txn_absorbed.append((uid, delta))
+        c.execute(_ADD_BALANCE_SQL, (uid, delta))
+        c.execute(_LEDGER_AFTER_ADD_SQL, (delta, "message", int(time.time()), uid))
+    return delta
+
+def _requeue_absorbed():
+    with _pending_lock:
+        for uid, delta in _txn_absorbed:
+            _pending[uid] = _pending.get(uid, 0) + delta
+    _txn_absorbed.clear()
+
+def queue_balance_change(user_id, amount):
+    """Buffer a small increment in memory. Returns how many users are waiting to be flushed."""
+    uid = str(user_id)
+    with _pending_lock:
+        _pending[uid] = _pending.get(uid, 0) + amount
+        return len(_pending)
+
+def pending_delta(user_id):
+    with _pending_lock:
+        return _pending.get(str(user_id), 0)
+
+def flush_pending():
+    """Apply every buffered increment in a single executemany transaction."""
+    with _lock:
+        with _pending_lock:
+            batch = list(_pending.items())
+            _pending.clear()
+        if not batch:
+            return 0
+        try:
+            now = int(time.time())
+            with transaction() as c:
+                c.executemany(_ADD_BALANCE_SQL, batch)
+                c.executemany(_LEDGER_AFTER_ADD_SQL, [(amount, "message", now, uid) for uid, amount in batch])
+                if _balance_listeners:
+                    for i in range(0, len(batch), 500):
+                        chunk = [uid for uid, _ in batch[i:i + 500]]
+                        marks = ",".join("?" * len(chunk))
+                        for uid, balance in c.execute(f"SELECT user_id, balance FROM SMILES WHERE user_id IN ({marks})", chunk):
+                            note_balance_change(uid, balance)
+        except Exception:
+            # Put the deltas back so the next flush retries them
+            with _pending_lock:
+                for uid, amount in batch:
+                    _pending[uid] = _pending.get(uid, 0) + amount
+            raise
+        return len(batch)
+
+
+def get_ledger_page(user_id, before=None, limit=10):
+    """Newest-first ledger rows for a user, continuing below a (ts, id) cursor.
+
+    Returns rows of (id, delta, balance, reason, ref_id, ts).
+    """
+    if before is None:
+        return fetch_all(
+            "SELECT id, delta, balance, reason, ref_id, ts FROM ledger "
+            "WHERE user_id = ? ORDER BY ts DESC, id DESC LIMIT ?",
+            (str(user_id), limit)
+        )
+    return fetch_all(
+        "SELECT id, delta, balance, reason, ref_id, ts FROM ledger "
+        "WHERE user_id = ? AND (ts, id) < (?, ?) ORDER BY ts DESC, id DESC LIMIT ?",
+        (str(user_id), before[0], before[1], limit)
+    )
+
+def snapshot_balances():
+    """Snapshot every balance that changed since the previous snapshot run."""
+    with transaction() as c:
+        since = c.execute("SELECT COALESCE(MAX(ledger_id), 0) FROM balance_snapshots").fetchone()[0]
+        c.execute('''
+            INSERT OR REPLACE INTO balance_snapshots (user_id, ledger_id, balance, ts)
+            SELECT l.user_id, MAX(l.id), s.balance, ?
+            FROM ledger l JOIN SMILES s ON s.user_id = l.user_id
+            WHERE l.id > ?
+            GROUP BY l.user_id
+        ''', (int(time.time()), since))
+        return c.rowcount
+
+def rebuild_balance(user_id):
+    """Recompute a balance from its latest snapshot plus the ledger tail after it."""
+    uid = str(user_id)
+    with _lock:
+        snap = fetch_one(
+            "SELECT ledger_id, balance FROM balance_snapshots WHERE user_id = ? ORDER BY ledger_id DESC LIMIT 1",
+            (uid,)
+        )
+        ledger_id, balance = snap if snap else (0, 0)
+        tail = fetch_one(
+            "SELECT COALESCE(SUM(delta), 0) FROM ledger WHERE user_id = ? AND id > ?",
+            (uid, ledger_id)
+        )[0]
+        return balance + tail
+
+
+# ---- Guild membership ----
+
+def add_guild_member(guild_id, user_id):
+    with transaction() as c:
+        c.execute("INSERT OR IGNORE INTO guild_members (guild_id, user_id) VALUES (?, ?)", (str(guild_id), str(user_id)))
+
+def remove_guild_member(guild_id, user_id):
+    with transaction() as c:
+        c.execute("DELETE FROM guild_members WHERE guild_id = ? AND user_id = ?", (str(guild_id), str(user_id)))
+
+def is_guild_synced(guild_id):
+    return fetch_one("SELECT 1 FROM guild_member_sync WHERE guild_id = ?", (str(guild_id),)) is not None
+
+def sync_guild_members(guild_id, user_ids):
+    """Reconcile a guild's stored membership with a full member list.
+
+    Only the difference is written: members who left are deleted and new
+    ones inserted. Returns (added, removed) counts.
+    """
+    gid = str(guild_id)
+    current = {str(uid) for uid in user_ids}
+    with transaction() as c:
+        stored = {row[0] for row in c.execute("SELECT user_id FROM guild_members WHERE guild_id = ?", (gid,))}
+        added, removed = current - stored, stored - current
+        c.executemany(
+            "DELETE FROM guild_members WHERE guild_id = ? AND user_id = ?",
+            [(gid, uid) for uid in removed]
+        )
+        c.executemany(
+            "INSERT OR IGNORE INTO guild_members (guild_id, user_id) VALUES (?, ?)",
+            [(gid, uid) for uid in added]
+        )
+        c.execute(
+            "INSERT OR REPLACE INTO guild_member_sync (guild_id, synced_at) VALUES (?, ?)",
+            (gid, int(time.time()))
+        )
+    return len(added), len(removed)
+
+def get_guild_leaderboard(guild_id, limit, offset=0, after=None):
+    """A page of the server leaderboard as dicts with user_id, balance and rank.
+
+    after is a (balance, user_id) keyset cursor from the last row of the
+    previous page; when given it replaces offset.
+    """
+    gid = str(guild_id)
+    with _lock:
+        if after is None:
+            rows = fetch_all('''
+                SELECT s.user_id, s.balance FROM guild_members g
+                JOIN SMILES s ON s.user_id = g.user_id
+                WHERE g.guild_id = ?
+                ORDER BY s.balance DESC, s.user_id
+                LIMIT ? OFFSET ?
+            ''', (gid, limit, offset))
+        else:
+            # Ties are ordered by user_id ascending, as in the rank index
+            balance, uid = after[0], str(after[1])
+            rows = fetch_all('''
+                SELECT s.user_id, s.balance FROM guild_members g
+                JOIN SMILES s ON s.user_id = g.user_id
+                WHERE g.guild_id = ? AND (s.balance < ? OR (s.balance = ? AND s.user_id > ?))
+                ORDER BY s.balance DESC, s.user_id
+                LIMIT ?
+            ''', (gid, balance, balance, uid, limit))
+            offset = fetch_one('''
+                SELECT COUNT(*) FROM guild_members g
+                JOIN SMILES s ON s.user_id = g.user_id
+                WHERE g.guild_id = ? AND (s.balance > ? OR (s.balance = ? AND s.user_id <= ?))
+            ''', (gid, balance, balance, uid))[0]
+        if not rows:
+            return []
+        # Same tie handling as a full ranking: the first row's rank comes from
+        # the count of strictly higher balances, the rest follow positionally.
+        rank = _count_guild_above(gid, rows[0][1]) + 1
+
+    ranked = []
+    last_balance = rows[0][1]
+    for position, (user_id, balance) in enumerate(rows, start=offset + 1):
+        if balance != last_balance:
+            rank = position
+        ranked.append({'user_id': user_id, 'balance': balance, 'rank': rank})
+        last_balance = balance
+    return ranked
+
+def get_guild_rank(guild_id, user_id):
+    """Server rank info for one member: {'rank', 'balance', 'total'}, or None if unranked."""
+    gid, uid = str(guild_id), str(user_id)
+    with _lock:
+        row = fetch_one('''
+            SELECT s.balance FROM guild_members g
+            JOIN SMILES s ON s.user_id = g.user_id
+            WHERE g.guild_id = ? AND g.user_id = ?
+        ''', (gid, uid))
+        if row is None:
+            return None
+        total = fetch_one(
+            "SELECT COUNT(*) FROM guild_members g JOIN SMILES s ON s.user_id = g.user_id WHERE g.guild_id = ?",
+            (gid,)
+        )[0]
+        return {'rank': _count_guild_above(gid, row[0]) + 1, 'balance': row[0], 'total': total}
+
+def _count_guild_above(gid, balance):
+    return fetch_one(
+        "SELECT COUNT(*) FROM guild_members g JOIN SMILES s ON s.user_id = g.user_id "
+        "WHERE g.guild_id = ? AND s.balance > ?",
+        (gid, balance)
+    )[0]
+
+
+# ---- Cooldowns ----
+
+def load_cooldowns(now):
+    """Every cooldown that hasn't expired yet, as (scope, user_id, expires_at)."""
+    return fetch_all("SELECT scope, user_id, expires_at FROM cooldowns WHERE expires_at > ?", (now,))
+
+def save_cooldowns(rows, now):
+    """Upsert (scope, user_id, expires_at) rows and drop expired ones in one transaction."""
+    with transaction() as c:
+        c.executemany(
+            "INSERT INTO cooldowns (scope, user_id, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(scope, user_id) DO UPDATE SET expires_at = excluded.expires_at",
+            [(scope, str(user_id), expires_at) for scope, user_id, expires_at in rows]
+        )
+        c.execute("DELETE FROM cooldowns WHERE expires_at <= ?", (now,))
+
+
+# ---- Async wrappers (await these from cogs) ----
+
+async def can_bid_async(user_id):
+    return await run_db(can_bid, user_id)
+
+async def increment_bid_async(user_id):
+    return await run_db(increment_bid, user_id)
+
+async def get_balance_async(user_id):
+    return await run_db(get_balance, user_id)
+
+async def update_balance_async(user_id, new_balance, reason="set", ref_id=None):
+    return await run_db(update_balance, user_id, new_balance, reason, ref_id)
+
+async def change_balance_async(user_id, amount, reason="adjust", ref_id=None):
+    return await run_db(change_balance, user_id, amount, reason, ref_id)
+
+async def try_debit_async(user_id, amount, reason="adjust", ref_id=None):
+    return await run_db(try_debit, user_id, amount, reason, ref_id)
+
+async def get_top_balances_async(limit):
+    return await run_db(get_top_balances, limit)
+
+async def get_rank_async(user_id):
+    return await run_db(get_rank, user_id)
+
+async def add_guild_member_async(guild_id, user_id):
+    return await run_db(add_guild_member, guild_id, user_id)
+
+async def remove_guild_member_async(guild_id, user_id):
+    return await run_db(remove_guild_member, guild_id, user_id)
+
+async def is_guild_synced_async(guild_id):
+    return await run_db(is_guild_synced, guild_id)
+
+async def sync_guild_members_async(guild_id, user_ids):
+    return await run_db(sync_guild_members, guild_id, user_ids)
+
+async def get_guild_leaderboard_async(guild_id, limit, offset=0, after=None):
+    return await run_db(get_guild_leaderboard, guild_id, limit, offset, after)
+
+async def get_guild_rank_async(guild_id, user_id):
+    return await run_db(get_guild_rank, guild_id, user_id)
+
+async def flush_pending_async():
+    return await run_db(flush_pending)
+
+async def get_ledger_page_async(user_id, before=None, limit=10):
+    return await run_db(get_ledger_page, user_id, before, limit)
+
+async def snapshot_balances_async():
+    return await run_db(snapshot_balances)
@@ -0,0 +1,107 @@
+import asyncio
+import time
+
+import database.coin_db as coin_db
+
+FLUSH_INTERVAL = 30
+
+
+class CooldownStore:
+    """Per-scope cooldown expiry times shared by every cog.
+
+    Lookups only touch memory. Expired entries are evicted on read and by a
+    periodic sweep, so memory is bounded by users with a live cooldown.
+    New expiry times are written to SQLite in batches so a restart keeps them.
+    """
+
+    def __init__(self):
+        self._expiry = {}   # scope -> {user_id: expires_at}
+        self._dirty = {}    # (scope, user_id) -> expires_at, not yet written
+        self._task = None
+
+    def remaining(self, scope, user_id):
+        """Seconds left on a user's cooldown, or 0 if they're free."""
+        entries = self._expiry.get(scope)
+        if not entries:
+            return 0
+        expires_at = entries.get(int(user_id))
+        if expires_at is None:
+            return 0
+        left = expires_at - time.time()
+        if left <= 0:
+            del entries[int(user_id)]
+            return 0
+        return left
+
+    def try_start(self, scope, user_id, seconds):
+        """Start a cooldown unless one is running, as a single step.
+
+        Returns 0 if it was started, otherwise the seconds left on the
+        running one. Call it before any await so two concurrent claims
+        can't both get through.
+        """
+        left = self.remaining(scope, user_id)
+        if left > 0:
+            return left
+        self.start(scope, user_id, seconds)
+        return 0
+
+    def start(self, scope, user_id, seconds):
+        expires_at = time.time() + seconds
+        self._expiry.setdefault(scope, {})[int(user_id)] = expires_at
+        self._dirty[(scope, int(user_id))] = expires_at
+
+    def release(self, scope, user_id):
+        """End a running cooldown early, e.g. when the claim it guarded failed."""
+        entries = self._expiry.get(scope)
+        if entries and entries.pop(int(user_id), None) is not None:
+            # Saved already expired, so the next flush deletes the stored row
+            self._dirty[(scope, int(user_id))] = time.time()
+
+    def evict_expired(self):
+        now = time.time()
+        for entries in self._expiry.values():
+            for user_id in [uid for uid, expires_at in entries.items() if expires_at <= now]:
+                del entries[user_id]
+
+    def load(self):
+        for scope, user_id, expires_at in coin_db.load_cooldowns(time.time()):
+            self._expiry.setdefault(scope, {})[int(user_id)] = expires_at
+
+    def flush(self):
+        """Write pending expiry times synchronously (used at shutdown)."""
+        rows = self._take_dirty()
+        coin_db.save_cooldowns(rows, time.time())
+
+    async def flush_async(self):
+        rows = self._take_dirty()
+        try:
+            await coin_db.run_db(coin_db.save_cooldowns, rows, time.time())
+        except Exception:
+            # Keep them for the next flush unless a newer expiry replaced them
+            for scope, user_id, expires_at in rows:
+                self._dirty.setdefault((scope, user_id), expires_at)
+            raise
+
+    def _take_dirty(self):
+        rows = [(scope, user_id, expires_at) for (scope, user_id), expires_at in self._dirty.items()]
+        self._dirty = {}
+        return rows
+
+    async def run(self):
+        """Load persisted cooldowns, then flush and sweep in the background."""
+        await coin_db.run_db(self.load)
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(FLUSH_INTERVAL)
+            try:
+                self.evict_expired()
+                await self.flush_async()
+            except Exception as e:
+                print(f"❌ Failed to flush cooldowns: {e}")
+
+
+cooldowns = CooldownStore()
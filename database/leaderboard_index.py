@@ -0,0 +1,268 @@
+import threading
+from bisect import bisect_left, bisect_right, insort
+
+import database.coin_db as coin_db
+
+
+class RankedBalances:
+    """Balances ordered highest first, with O(log n) rank and position lookups.
+
+    Keys are (-balance, user_id) tuples kept in sorted buckets of a few
+    hundred entries. A Fenwick tree over the bucket sizes turns "how many
+    keys come before X" and "which key is at position k" into log-time
+    queries, while inserts only shift one small bucket.
+    """
+
+    LOAD = 512
+
+    def __init__(self, items=()):
+        self._keys = {}
+        for user_id, balance in items:
+            self._keys[str(user_id)] = (-balance, str(user_id))
+        ordered = sorted(self._keys.values())
+        self._buckets = [ordered[i:i + self.LOAD] for i in range(0, len(ordered), self.LOAD)]
+        self._maxes = [bucket[-1] for bucket in self._buckets]
+        self._rebuild_tree()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, user_id):
+        return str(user_id) in self._keys
+
+    def balance(self, user_id):
+        key = self._keys.get(str(user_id))
+        return -key[0] if key else None
+
+    def update(self, user_id, balance):
+        uid = str(user_id)
+        if uid in self._keys:
+            self._remove_key(self._keys[uid])
+        key = (-balance, uid)
+        self._keys[uid] = key
+        self._insert_key(key)
+
+    def remove(self, user_id):
+        key = self._keys.pop(str(user_id), None)
+        if key:
+            self._remove_key(key)
+
+    def count_above(self, balance):
+        """Number of entries with a strictly higher balance."""
+        return self._count_before((-balance, ""))
+
+    def count_through(self, balance, user_id):
+        """Number of entries up to and including the (balance, user_id) position,
+        whether or not that user is still there. Used as a keyset cursor."""
+        key = (-balance, str(user_id))
+        idx = bisect_left(self._maxes, key)
+        if idx == len(self._buckets):
+            return len(self._keys)
+        return self._tree_prefix(idx) + bisect_right(self._buckets[idx], key)
+
+    def rank(self, user_id):
+        """Competition rank (ties share a rank), or None if the user isn't present."""
+        key = self._keys.get(str(user_id))
+        if key is None:
+            return None
+        return self.count_above(-key[0]) + 1
+
+    def page(self, limit, offset=0):
+        """(user_id, balance) pairs for positions offset .. offset + limit - 1."""
+        if offset >= len(self._keys) or limit <= 0:
+            return []
+        bucket_idx, pos = self._locate(offset)
+        result = []
+        while bucket_idx < len(self._buckets) and len(result) < limit:
+            for neg_balance, uid in self._buckets[bucket_idx][pos:pos + limit - len(result)]:
+                result.append((uid, -neg_balance))
+            bucket_idx += 1
+            pos = 0
+        return result
+
+    # ---- internals ----
+
+    def _insert_key(self, key):
+        if not self._buckets:
+            self._buckets.append([key])
+            self._maxes.append(key)
+            self._rebuild_tree()
+            return
+        idx = min(bisect_left(self._maxes, key), len(self._buckets) - 1)
+        bucket = self._buckets[idx]
+        insort(bucket, key)
+        self._maxes[idx] = bucket[-1]
+        if len(bucket) > self.LOAD * 2:
+            self._buckets[idx:idx + 1] = [bucket[:self.LOAD], bucket[self.LOAD:]]
+            self._maxes[idx:idx + 1] = [bucket[self.LOAD - 1], bucket[-1]]
+            self._rebuild_tree()
+        else:
+            self._tree_add(idx, 1)
+
+    def _remove_key(self, key):
+        idx = bisect_left(self._maxes, key)
+        bucket = self._buckets[idx]
+        del bucket[bisect_left(bucket, key)]
+        if bucket:
+            self._maxes[idx] = bucket[-1]
+            self._tree_add(idx, -1)
+        else:
+            del self._buckets[idx]
+            del self._maxes[idx]
+            self._rebuild_tree()
+
+    def _count_before(self, key):
+        idx = bisect_left(self._maxes, key)
+        if idx == len(self._buckets):
+            return len(self._keys)
+        return self._tree_prefix(idx) + bisect_left(self._buckets[idx], key)
+
+    def _rebuild_tree(self):
+        tree = [0] * (len(self._buckets) + 1)
+        for i, bucket in enumerate(self._buckets, start=1):
+            tree[i] += len(bucket)
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _tree_add(self, idx, delta):
+        i = idx + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _tree_prefix(self, idx):
+        """Total size of buckets before bucket idx."""
+        total = 0
+        i = idx
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def _locate(self, position):
+        """(bucket index, offset in bucket) of the key at a global position."""
+        idx = 0
+        step = 1 << (len(self._tree).bit_length())
+        while step:
+            nxt = idx + step
+            if nxt < len(self._tree) and self._tree[nxt] <= position:
+                idx = nxt
+                position -= self._tree[nxt]
+            step >>= 1
+        return idx, position
+
+
+class LeaderboardIndex:
+    """Global and per-guild RankedBalances kept in sync with coin_db.
+
+    Balance changes arrive from the database thread through a coin_db
+    balance listener, so every method takes the index lock.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self._lock = threading.Lock()
+        self._global = RankedBalances()
+        self._guilds = {}
+        self._member_of = {}
+
+    def load(self):
+        """Build the index from the database and start following balance changes.
+
+        Runs on the database thread (via coin_db.run_db) so no write can slip
+        in between the initial read and the listener being attached.
+        """
+        balances = coin_db.fetch_all("SELECT user_id, balance FROM SMILES")
+        members = coin_db.fetch_all("SELECT guild_id, user_id FROM guild_members")
+        with self._lock:
+            self._global = RankedBalances(balances)
+            self._guilds = {}
+            self._member_of = {}
+            lookup = dict(balances)
+            grouped = {}
+            for guild_id, user_id in members:
+                self._member_of.setdefault(user_id, set()).add(guild_id)
+                if user_id in lookup:
+                    grouped.setdefault(guild_id, []).append((user_id, lookup[user_id]))
+            for guild_id in {guild_id for guild_id, _ in members}:
+                self._guilds[guild_id] = RankedBalances(grouped.get(guild_id, ()))
+            self.ready = True
+        coin_db.add_balance_listener(self.on_balance_change)
+
+    def close(self):
+        coin_db.remove_balance_listener(self.on_balance_change)
+        self.ready = False
+
+    def on_balance_change(self, changes):
+        with self._lock:
+            for user_id, balance in changes:
+                uid = str(user_id)
+                self._global.update(uid, balance)
+                for guild_id in self._member_of.get(uid, ()):
+                    self._guilds[guild_id].update(uid, balance)
+
+    def guilds_of(self, user_id):
+        with self._lock:
+            return set(self._member_of.get(str(user_id), ()))
+
+    def add_member(self, guild_id, user_id):
+        gid, uid = str(guild_id), str(user_id)
+        with self._lock:
+            self._member_of.setdefault(uid, set()).add(gid)
+            ranked = self._guilds.setdefault(gid, RankedBalances())
+            balance = self._global.balance(uid)
+            if balance is not None:
+                ranked.update(uid, balance)
+
+    def remove_member(self, guild_id, user_id):
+        gid, uid = str(guild_id), str(user_id)
+        with self._lock:
+            self._member_of.get(uid, set()).discard(gid)
+            if gid in self._guilds:
+                self._guilds[gid].remove(uid)
+
+    def sync_guild(self, guild_id, user_ids):
+        gid = str(guild_id)
+        with self._lock:
+            for guilds in self._member_of.values():
+                guilds.discard(gid)
+            items = []
+            for user_id in user_ids:
+                uid = str(user_id)
+                self._member_of.setdefault(uid, set()).add(gid)
+                balance = self._global.balance(uid)
+                if balance is not None:
+                    items.append((uid, balance))
+            self._guilds[gid] = RankedBalances(items)
+
+    def guild_page(self, guild_id, limit, offset=0, after=None):
+        """Same shape as coin_db.get_guild_leaderboard."""
+        with self._lock:
+            ranked = self._guilds.get(str(guild_id))
+            if ranked is None:
+                return []
+            if after is not None:
+                offset = ranked.count_through(*after)
+            rows = ranked.page(limit, offset)
+            if not rows:
+                return []
+            rank = ranked.count_above(rows[0][1]) + 1
+
+        result = []
+        last_balance = rows[0][1]
+        for position, (user_id, balance) in enumerate(rows, start=offset + 1):
+            if balance != last_balance:
+                rank = position
+            result.append({'user_id': user_id, 'balance': balance, 'rank': rank})
+            last_balance = balance
+        return result
+
+    def guild_rank(self, guild_id, user_id):
+        """Same shape as coin_db.get_guild_rank."""
+        with self._lock:
+            ranked = self._guilds.get(str(guild_id))
+            if ranked is None or user_id not in ranked:
+                return None
+            return {'rank': ranked.rank(user_id), 'balance': ranked.balance(user_id), 'total': len(ranked)}
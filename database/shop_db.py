@@ -0,0 +1,313 @@
+import json
+import os
+import time
+from datetime import datetime
+
+from database.coin_db import transaction, fetch_one, fetch_all, run_db, credit_in, debit_in
+
+SHOP_ITEMS_FILE = "database/shop_items.json"
+SHOP_TICKETS_FILE = "database/shop_tickets.json"
+
+_ITEM_COLUMNS = ("title", "description", "price", "role_id", "image_url", "stock", "channel_id", "message_id")
+_CATALOG_FIELDS = ("title", "description", "price", "role_id", "image_url")
+_TICKET_COLUMNS = (
+    "rowid", "ticket_id", "user_id", "username", "item_id", "item", "price", "status",
+    "created_at", "closed_by", "closed_at", "notes"
+)
+
+
+def init_shop_db():
+    with transaction() as c:
+        # stock is NULL for unlimited items; channel_id/message_id locate the posted listing
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS shop_items (
+                item_id TEXT PRIMARY KEY,
+                title TEXT NOT NULL,
+                description TEXT,
+                price INTEGER NOT NULL,
+                role_id INTEGER,
+                image_url TEXT,
+                created_at INTEGER NOT NULL,
+                stock INTEGER,
+                channel_id INTEGER,
+                message_id INTEGER
+            )
+        ''')
+        # Bumped by triggers on catalog writes, including ones made outside
+        # the bot, so the in-memory catalog knows when to reload. Purchases
+        # taking stock and listing message ids don't count; restocks do.
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS shop_meta (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            )
+        ''')
+        c.execute("INSERT OR IGNORE INTO shop_meta (key, value) VALUES ('catalog_version', 0)")
+        triggers = {
+            "insert": "AFTER INSERT ON shop_items",
+            "delete": "AFTER DELETE ON shop_items",
+            "fields": f"AFTER UPDATE OF {', '.join(_CATALOG_FIELDS)} ON shop_items",
+            "restock": (
+                "AFTER UPDATE OF stock ON shop_items "
+                "WHEN NEW.stock IS NULL OR OLD.stock IS NULL OR NEW.stock > OLD.stock"
+            ),
+        }
+        for name, event in triggers.items():
+            c.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS shop_items_version_{name} {event}
+                BEGIN
+                    UPDATE shop_meta SET value = value + 1 WHERE key = 'catalog_version';
+                END
+            ''')
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS shop_tickets (
+                ticket_id TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                username TEXT,
+                item_id TEXT,
+                item TEXT NOT NULL,
+                price INTEGER NOT NULL,
+                status TEXT NOT NULL DEFAULT 'open',
+                created_at INTEGER NOT NULL,
+                closed_by TEXT,
+                closed_at INTEGER,
+                notes TEXT
+            )
+        ''')
+        c.execute("CREATE INDEX IF NOT EXISTS idx_tickets_status ON shop_tickets (status, created_at)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_tickets_user ON shop_tickets (user_id, status)")
+    import_json_items()
+    import_json_tickets()
+
+
+def import_json_items():
+    """One-time import of the old shop_items.json, renamed to *.imported afterwards."""
+    if not os.path.exists(SHOP_ITEMS_FILE):
+        return
+    with open(SHOP_ITEMS_FILE, "r") as f:
+        items = json.load(f)
+    now = int(time.time())
+    with transaction() as c:
+        c.executemany(
+            "INSERT OR IGNORE INTO shop_items (item_id, title, description, price, role_id, image_url, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (item_id, item["title"], item.get("description"), item["price"],
+                 item.get("role_id"), item.get("image_url"), now)
+                for item_id, item in items.items()
+            ]
+        )
+    os.replace(SHOP_ITEMS_FILE, SHOP_ITEMS_FILE + ".imported")
+
+
+def _parse_timestamp(value):
+    """Unix time from the str(datetime) stamps the JSON ticket file used."""
+    if not value:
+        return None
+    try:
+        return int(datetime.fromisoformat(value).timestamp())
+    except ValueError:
+        return None
+
+
+def import_json_tickets():
+    """One-time import of the old shop_tickets.json, renamed to *.imported afterwards."""
+    if not os.path.exists(SHOP_TICKETS_FILE):
+        return
+    with open(SHOP_TICKETS_FILE, "r") as f:
+        tickets = json.load(f)
+    now = int(time.time())
+    with transaction() as c:
+        c.executemany(
+            "INSERT OR IGNORE INTO shop_tickets "
+            "(ticket_id, user_id, username, item, price, status, created_at, closed_by, closed_at, notes) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (ticket_id, str(t["user_id"]), t.get("username"), t["item"], t["price"], t.get("status", "open"),
+                 _parse_timestamp(t.get("timestamp")) or now, t.get("closed_by"),
+                 _parse_timestamp(t.get("closed_at")), t.get("notes"))
+                for ticket_id, t in tickets.items()
+            ]
+        )
+    os.replace(SHOP_TICKETS_FILE, SHOP_TICKETS_FILE + ".imported")
+
+
+def get_catalog_version():
+    return fetch_one("SELECT value FROM shop_meta WHERE key = 'catalog_version'")[0]
+
+
+def load_catalog():
+    """(version, {item_id: item}) read together, so the version matches the items."""
+    with transaction() as c:
+        version = c.execute("SELECT value FROM shop_meta WHERE key = 'catalog_version'").fetchone()[0]
+        rows = c.execute(
+            f"SELECT item_id, {', '.join(_ITEM_COLUMNS)} FROM shop_items ORDER BY created_at, item_id"
+        ).fetchall()
+    return version, {row[0]: dict(zip(_ITEM_COLUMNS, row[1:])) for row in rows}
+
+
+def save_item(item_id, item):
+    """Insert or replace one catalog item. Returns the new catalog version."""
+    with transaction() as c:
+        c.execute('''
+            INSERT INTO shop_items (item_id, title, description, price, role_id, image_url, stock, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(item_id) DO UPDATE SET
+                title = excluded.title, description = excluded.description, price = excluded.price,
+                role_id = excluded.role_id, image_url = excluded.image_url, stock = excluded.stock
+        ''', (
+            item_id, item["title"], item.get("description"), item["price"],
+            item.get("role_id"), item.get("image_url"), item.get("stock"), int(time.time())
+        ))
+        return c.execute("SELECT value FROM shop_meta WHERE key = 'catalog_version'").fetchone()[0]
+
+
+def set_item_message(item_id, channel_id, message_id):
+    with transaction() as c:
+        c.execute(
+            "UPDATE shop_items SET channel_id = ?, message_id = ? WHERE item_id = ?",
+            (channel_id, message_id, item_id)
+        )
+
+
+def purchase_item(item_id, user_id, username, ticket_id=None):
+    """Buy one of an item in a single transaction.
+
+    Checks stock, debits the price, takes one from stock and, given a
+    ticket_id, opens the ticket. Either all of it is written or none of it,
+    and the database lock is never held across a Discord call.
+    Returns (status, balance, stock) where status is "ok", "funds",
+    "sold_out" or "gone"; stock is None for unlimited items.
+    """
+    uid = str(user_id)
+    with transaction() as c:
+        row = c.execute("SELECT title, price, stock FROM shop_items WHERE item_id = ?", (item_id,)).fetchone()
+        if row is None:
+            return "gone", None, None
+        title, price, stock = row
+        if stock is not None and stock <= 0:
+            return "sold_out", None, 0
+        paid, balance = debit_in(c, uid, price, "shop", ticket_id or item_id)
+        if not paid:
+            return "funds", balance, stock
+        if stock is not None:
+            stock = c.execute(
+                "UPDATE shop_items SET stock = stock - 1 WHERE item_id = ? RETURNING stock", (item_id,)
+            ).fetchone()[0]
+        if ticket_id:
+            c.execute(
+                "INSERT INTO shop_tickets (ticket_id, user_id, username, item_id, item, price, status, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, 'open', ?)",
+                (ticket_id, uid, username, item_id, title, price, int(time.time()))
+            )
+        return "ok", balance, stock
+
+
+def refund_purchase(item_id, user_id, price):
+    """Undo a purchase that couldn't be delivered: refund and put the unit back.
+
+    Returns the item's stock afterwards (None if unlimited or gone).
+    """
+    with transaction() as c:
+        credit_in(c, user_id, price, "shop", item_id)
+        row = c.execute(
+            "UPDATE shop_items SET stock = stock + 1 WHERE item_id = ? AND stock IS NOT NULL RETURNING stock",
+            (item_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+
+def get_open_tickets(limit, after=None):
+    """Oldest open tickets first, as dicts, continuing after a (created_at, rowid) cursor."""
+    after = after or (-1, -1)
+    rows = fetch_all(
+        f"SELECT {', '.join(_TICKET_COLUMNS)} FROM shop_tickets "
+        "WHERE status = 'open' AND (created_at, rowid) > (?, ?) ORDER BY created_at, rowid LIMIT ?",
+        (after[0], after[1], limit)
+    )
+    return [dict(zip(_TICKET_COLUMNS, row)) for row in rows]
+
+
+def count_open_tickets():
+    return fetch_one("SELECT COUNT(*) FROM shop_tickets WHERE status = 'open'")[0]
+
+
+def close_user_tickets(user_id, closed_by, notes=None):
+    """Close every open ticket of one user. Returns the closed ticket ids."""
+    with transaction() as c:
+        rows = c.execute(
+            "UPDATE shop_tickets SET status = 'closed', closed_by = ?, closed_at = ?, notes = COALESCE(?, notes) "
+            "WHERE user_id = ? AND status = 'open' RETURNING ticket_id",
+            (closed_by, int(time.time()), notes, str(user_id))
+        ).fetchall()
+    return [row[0] for row in rows]
+
+
+async def purchase_item_async(item_id, user_id, username, ticket_id=None):
+    return await run_db(purchase_item, item_id, user_id, username, ticket_id)
+
+async def refund_purchase_async(item_id, user_id, price):
+    return await run_db(refund_purchase, item_id, user_id, price)
+
+async def set_item_message_async(item_id, channel_id, message_id):
+    return await run_db(set_item_message, item_id, channel_id, message_id)
+
+async def get_open_tickets_async(limit, after=None):
+    return await run_db(get_open_tickets, limit, after)
+
+async def count_open_tickets_async():
+    return await run_db(count_open_tickets)
+
+async def close_user_tickets_async(user_id, closed_by, notes=None):
+    return await run_db(close_user_tickets, user_id, closed_by, notes)
+
+
+class ShopCatalog:
+    """Shop items keyed by item_id, loaded once and kept in memory.
+
+    Writes go through to SQLite. Catalog edits bump a version counter, so
+    check() only reloads when someone else edited the catalog. Stock taken
+    by purchases is applied here from each purchase's result instead.
+    """
+
+    def __init__(self):
+        self.items = {}
+        self.version = None
+
+    def get(self, item_id):
+        return self.items.get(item_id)
+
+    async def load(self):
+        self.version, self.items = await run_db(load_catalog)
+
+    async def check(self):
+        """Reload if the stored catalog changed since we last read it."""
+        if await run_db(get_catalog_version) != self.version:
+            await self.load()
+
+    async def add(self, item_id, item):
+        version = await run_db(save_item, item_id, item)
+        if self.version is not None and version == self.version + 1:
+            self.items[item_id] = dict(item)
+            self.version = version
+        else:
+            # Someone else wrote in between; read everything back
+            await self.load()
+
+    def set_stock(self, item_id, stock):
+        item = self.items.get(item_id)
+        if item is not None:
+            item["stock"] = stock
+
+    def note_stock_taken(self, item_id, stock):
+        """Apply the stock left after a purchase. Concurrent purchases can
+        report back in any order, and purchases only ever lower it."""
+        item = self.items.get(item_id)
+        if item is not None and stock is not None:
+            item["stock"] = stock if item.get("stock") is None else min(item["stock"], stock)
+
+    async def set_message(self, item_id, channel_id, message_id):
+        await set_item_message_async(item_id, channel_id, message_id)
+        item = self.items.get(item_id)
+        if item is not None:
+            item["channel_id"], item["message_id"] = channel_id, message_id
@@ -0,0 +1,136 @@
+import asyncio
+import gzip
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+from database.coin_db import transaction, fetch_all, run_db
+
+ARCHIVE_DIR = "database/ticket_archive"
+ARCHIVE_BATCH = 500
+
+# Closed tickets leave the hot shop_tickets table for gzip JSON-lines files
+# named by purchase month. Each batch gets its own file, named after its first
+# ticket and written under a temporary name, then renamed into place, so a
+# crash mid-write never leaves a damaged file behind. A batch retried after a
+# crash has the same first ticket and replaces its earlier file.
+_ARCHIVED_COLUMNS = (
+    "ticket_id", "user_id", "username", "item_id", "item", "price", "status",
+    "created_at", "closed_by", "closed_at", "notes"
+)
+
+
+def _month_of(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m")
+
+
+def _batch_path(month, first_ticket_id):
+    return os.path.join(ARCHIVE_DIR, f"tickets-{month}-{first_ticket_id}.jsonl.gz")
+
+
+def _file_month(name):
+    return name[len("tickets-"):len("tickets-YYYY-MM")]
+
+
+def archive_files(month=None):
+    """Archive file names, newest month first, optionally for one month only."""
+    if not os.path.isdir(ARCHIVE_DIR):
+        return []
+    names = [
+        name for name in os.listdir(ARCHIVE_DIR)
+        if name.startswith("tickets-") and name.endswith(".jsonl.gz") and (month is None or _file_month(name) == month)
+    ]
+    return sorted(names, reverse=True)
+
+
+def archive_closed_tickets(closed_before, limit=ARCHIVE_BATCH):
+    """Move up to limit tickets closed before closed_before into the archive.
+
+    Rows are written, synced to disk and renamed into place before they are
+    deleted. After a crash in between, the next run picks the same rows and
+    rewrites the same files, so no ticket is archived twice; at worst an
+    unused .tmp file is left.
+    Returns how many tickets were moved.
+    """
+    rows = fetch_all(
+        f"SELECT {', '.join(_ARCHIVED_COLUMNS)} FROM shop_tickets "
+        "WHERE status = 'closed' AND closed_at < ? ORDER BY closed_at, ticket_id LIMIT ?",
+        (closed_before, limit)
+    )
+    if not rows:
+        return 0
+
+    by_month = {}
+    for row in rows:
+        ticket = dict(zip(_ARCHIVED_COLUMNS, row))
+        by_month.setdefault(_month_of(ticket["created_at"]), []).append(ticket)
+
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    for month, tickets in by_month.items():
+        path = _batch_path(month, tickets[0]["ticket_id"])
+        with open(path + ".tmp", "wb") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="wb") as f:
+                for ticket in tickets:
+                    f.write((json.dumps(ticket) + "\n").encode())
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(path + ".tmp", path)
+
+    with transaction() as c:
+        c.executemany(
+            "DELETE FROM shop_tickets WHERE ticket_id = ? AND status = 'closed'",
+            [(row[0],) for row in rows]
+        )
+    return len(rows)
+
+
+def search_archive(user_id=None, text=None, month=None, after=None, limit=10):
+    """Stream archived tickets matching every given filter.
+
+    Files are read newest month first, one line at a time, so memory use
+    doesn't depend on archive size. user_id is checked on the raw line before
+    it is parsed. after is a (file name, line number) cursor from a previous
+    call.
+    Returns (tickets, next cursor or None).
+    """
+    names = archive_files(month)
+    if after is not None:
+        names = [name for name in names if name <= after[0]]
+    user_marker = f'"user_id": "{user_id}"' if user_id is not None else None
+    text = text.lower() if text else None
+
+    found = []
+    for name in names:
+        skip = after[1] if after is not None and name == after[0] else -1
+        try:
+            with gzip.open(os.path.join(ARCHIVE_DIR, name), "rt", encoding="utf-8") as f:
+                for line_no, line in enumerate(f):
+                    if line_no <= skip or (user_marker and user_marker not in line):
+                        continue
+                    try:
+                        ticket = json.loads(line)
+                    except ValueError:
+                        continue  # a line cut short by the damage below
+                    if text and not any(
+                        text in str(ticket.get(field) or "").lower() for field in ("ticket_id", "item", "username", "notes")
+                    ):
+                        continue
+                    found.append((ticket, (name, line_no)))
+                    if len(found) > limit:
+                        return [t for t, _ in found[:limit]], found[limit - 1][1]
+        except FileNotFoundError:
+            continue
+    return [t for t, _ in found], None
+
+
+def archive_cutoff(days):
+    return int(time.time()) - days * 86400
+
+
+async def archive_closed_tickets_async(closed_before, limit=ARCHIVE_BATCH):
+    return await run_db(archive_closed_tickets, closed_before, limit)
+
+async def search_archive_async(user_id=None, text=None, month=None, after=None, limit=10):
+    # Only reads files, so it stays off the database thread
+    return await asyncio.to_thread(search_archive, user_id, text, month, after, limit)
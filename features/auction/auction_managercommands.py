@@ -1,6 +1,4 @@
 import asyncio
-import os
-import json
 import time
 from datetime import datetime, timedelta
 import discord
@@ -8,41 +6,23 @@ from discord.ext import commands
 from discord import app_commands
 from discord.ui import View, Button
 import pytz
-from database.coin_db import get_balance, change_balance
+from database.coin_db import run_db
+from database.cooldowns import cooldowns
+import database.auction_db as auction_db
+from features.auction.bid_pipeline import BidPipeline
+from features.auction.notifications import NotificationDispatcher
+from utils.coalesce import CoalescedUpdater
+from utils.scheduler import TimerScheduler
+from utils.user_resolver import resolver
 
-AUCTION_FILE = "database/current_auction.json"
-WIN_TRACKER_FILE = "database/win_tracker.json"
 CONFIG_FILE = "database/auction_config.json"
+WARNING_LEAD = 30 * 60  # send the "ending soon" warning this many seconds before the end
 
 
 def get_embed_color():
     # Always use #d9fc32
     return 0xd9fc32
 
-
-def save_json(file, data):
-    with open(file, "w") as f:
-        json.dump(data, f)
-
-
-def load_json(file):
-    if not os.path.exists(file):
-        return {}
-    with open(file, "r") as f:
-        return json.load(f)
-
-
-def can_win(user_id):
-    wins = load_json(WIN_TRACKER_FILE)
-    return wins.get(str(user_id), 0) < 4
-
-
-def add_win(user_id):
-    wins = load_json(WIN_TRACKER_FILE)
-    uid = str(user_id)
-    wins[uid] = wins.get(uid, 0) + 1
-    save_json(WIN_TRACKER_FILE, wins)
-
 def format_thread_bid_message(user, amount):
     return f"{user.mention} placed a bid of **{amount}** smiles!"
 
@@ -52,14 +32,21 @@ def format_bid_message(user, amount, item):
 
 class BidModal(discord.ui.Modal, title="Place Your Bid"):
     amount = discord.ui.TextInput(label="Bid Amount", placeholder="Enter your bid (number)", required=True)
+    max_amount = discord.ui.TextInput(
+        label="Maximum Bid (optional)",
+        placeholder="We'll outbid others for you up to this amount",
+        required=False
+    )
 
-    def __init__(self, bot):
+    def __init__(self, bot, message_id=None):
         super().__init__()
         self.bot = bot
+        self.message_id = message_id  # the auction message whose button opened this
 
     async def on_submit(self, interaction: discord.Interaction):
         try:
             amount = int(self.amount.value)
+            max_amount = int(self.max_amount.value) if self.max_amount.value else None
         except ValueError:
             return await interaction.response.send_message("❌ Please enter a valid number.", ephemeral=True)
 
@@ -75,7 +62,11 @@ class BidModal(discord.ui.Modal, title="Place Your Bid"):
             await cog._place_bid(
                 interaction.user, 
                 amount, 
-                lambda msg: interaction.followup.send(msg, ephemeral=True)
+                lambda msg: interaction.followup.send(msg, ephemeral=True),
+                interaction.guild,
+                channel=interaction.channel,
+                message_id=self.message_id,
+                max_amount=max_amount
             )
         except Exception as e:
             await interaction.followup.send(f"❌ Something went wrong: {e}", ephemeral=True)
@@ -90,22 +81,18 @@ class BidButton(Button):
     def __init__(self, bot):
         super().__init__(label="Place Bid", style=discord.ButtonStyle.green, custom_id="auction_place_bid")
         self.bot = bot
-        self.cooldowns = {}  # 1 bid per 30 seconds per user
 
     async def callback(self, interaction: discord.Interaction):
-        # Check cooldown
-        current_time = time.time()
-        last_bid = self.cooldowns.get(interaction.user.id, 0)
-        
-        if current_time - last_bid < 30:  # 30 second cooldown
-            remaining = 30 - (current_time - last_bid)
+        # Check cooldown (1 bid per 30 seconds per user)
+        remaining = cooldowns.try_start("bid_button", interaction.user.id, 30)
+        if remaining > 0:
             return await interaction.response.send_message(
                 f"⏱️ You're bidding too fast! Please wait {remaining:.1f} seconds.",
                 ephemeral=True
             )
 
-        self.cooldowns[interaction.user.id] = current_time
-        await interaction.response.send_modal(BidModal(self.bot))
+        message_id = interaction.message.id if interaction.message else None
+        await interaction.response.send_modal(BidModal(self.bot, message_id))
 
 
 async def send_auction_embed(channel, auction, bot):
@@ -114,30 +101,18 @@ async def send_auction_embed(channel, auction, bot):
     msg = await channel.send(embed=embed, view=view)
     return msg
 
-def format_countdown(end_time):
-    # Convert to local time
-    local_tz = pytz.timezone('UTC')  # Default to UTC
-    now = datetime.now(local_tz)
-    end_time_local = end_time.astimezone(local_tz)
-    
-    remaining = end_time_local - now
-    if remaining.total_seconds() > 0:
-        days = remaining.days
-        hours, remainder = divmod(remaining.seconds, 3600)
-        minutes, _ = divmod(remainder, 60)
-        return f"⏳ REMAINING TIME : {days}d {hours}h {minutes}m"
-    else:
-        return "🛑 AUCTION ENDED"
+def get_end_timestamp(auction):
+    """Unix end time of an auction, parsed once per end_time value."""
+    cached = auction.get("_end_ts")
+    if cached is None or cached[0] != auction["end_time"]:
+        end_time = datetime.fromisoformat(auction["end_time"]).replace(tzinfo=pytz.UTC)
+        cached = (auction["end_time"], end_time.timestamp())
+        auction["_end_ts"] = cached
+    return cached[1]
 
 async def get_bidder_mention(bot, bidder_id):
     if bidder_id:
-        try:
-            user = bot.get_user(int(bidder_id))
-            if user is None:
-                user = await bot.fetch_user(int(bidder_id))
-            return user.mention
-        except Exception:
-            return f"`{bidder_id}`"
+        return await resolver.mention(bot, bidder_id)
     return "None"
 
 async def build_auction_embed(auction, bot):
@@ -198,13 +173,9 @@ async def build_auction_embed(auction, bot):
         inline=False
     )
     
-    end_time = datetime.fromisoformat(auction["end_time"]).replace(tzinfo=pytz.UTC)
-    countdown = format_countdown(end_time)
-    # Check if auction has ended
-    end_time = datetime.fromisoformat(auction["end_time"]).replace(tzinfo=pytz.UTC)
-    countdown = format_countdown(end_time)
-    
-    if countdown == "🛑 AUCTION ENDED":
+    # Remaining time is rendered by Discord itself, so the embed never needs a timer edit
+    end_ts = get_end_timestamp(auction)
+    if end_ts <= time.time():
         embed.add_field(
             name="STATUS",
             value="**🛑 AUCTION HAS ENDED**",
@@ -214,7 +185,7 @@ async def build_auction_embed(auction, bot):
     else:
         embed.add_field(
             name="", 
-            value=f"**{countdown}**\n\n*Ends at: <t:{int(end_time.timestamp())}:F>*", 
+            value=f"**⏳ ENDS <t:{int(end_ts)}:R>**\n\n*Ends at: <t:{int(end_ts)}:F>*", 
             inline=False
         )
 
@@ -236,55 +207,125 @@ async def build_auction_embed(auction, bot):
 class AuctionManager(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.live_update_message = None
-        self.all_bidders = set()  # Track all users who have bid
-        self.pending_refunds = {}  # Track pending refunds for overbid users
-        self.bid_cooldowns = {}
-        self.auction_message_id = None  # Add this line to track the message ID
-        bot.loop.create_task(self.reload_active_auction())
+        self.auctions = {}  # auction id -> in-memory copy of each active auction row
+        self.live_messages = {}  # auction id -> the auction's embed message
+        self.wins = {}  # This month's win counts, cached from auction_wins_monthly
+        self.wins_month = auction_db.current_month()
+        self.all_bidders = {}  # auction id -> set of users who have bid
+        self.escrow = {}  # auction id -> {user id: smiles held}, mirrors auction_escrow
+        self.bid_pipelines = {}  # auction id -> BidPipeline, one worker per auction
+        self.embed_updaters = {}  # auction id -> CoalescedUpdater for the live embed
+        self.timers = {}  # auction id -> scheduler handles for its warning and end
+        self.scheduler = TimerScheduler()
+        self.notifier = NotificationDispatcher(bot)
+        self.background = set()  # fire-and-forget tasks, held until they finish
+        self._spawn(self.reload_active_auctions())
+
+    def _spawn(self, coro):
+        task = self.bot.loop.create_task(coro)
+        self.background.add(task)
+        task.add_done_callback(self.background.discard)
+        return task
+
+    async def cog_unload(self):
+        # Nothing may keep acting on this cog once it is gone: timers, bid
+        # workers, embed redraws and in-flight announcements or DMs
+        await asyncio.gather(
+            self.scheduler.close(),
+            *(pipeline.cancel() for pipeline in self.bid_pipelines.values()),
+            *(updater.close() for updater in self.embed_updaters.values())
+        )
+        for task in self.background:
+            task.cancel()
+        await asyncio.gather(*self.background, return_exceptions=True)
+
+    def can_win(self, user_id):
+        return self.month_wins().get(str(user_id), 0) < 4
+
+    def month_wins(self):
+        """The cached win counts, emptied when a new month starts."""
+        month = auction_db.current_month()
+        if month != self.wins_month:
+            self.wins = {}
+            self.wins_month = month
+        return self.wins
+
+    def guild_auctions(self, guild):
+        """Active auctions running in a guild; none outside one."""
+        if guild is None:
+            return []
+        return [
+            auction for auction in self.auctions.values()
+            if getattr(self.bot.get_channel(auction.get("channel_id")), "guild", None) == guild
+        ]
+
+    def find_auction(self, guild, channel=None, message_id=None, auction_id=None):
+        """The guild's active auction a bid or command refers to, or None if it's unclear.
+
+        An explicit id or the auction's own message wins, then the auction's
+        thread, then its channel if only one auction runs there, then the only
+        auction running in the guild. Auctions in other guilds are never returned.
+        """
+        auctions = self.guild_auctions(guild)
+        if auction_id is not None:
+            return next((auction for auction in auctions if auction["id"] == auction_id), None)
+        if message_id is not None:
+            for auction in auctions:
+                if auction.get("message_id") == message_id:
+                    return auction
+        if channel is not None:
+            for auction in auctions:
+                if auction.get("thread_id") == channel.id:
+                    return auction
+            here = [auction for auction in auctions if auction.get("channel_id") == channel.id]
+            if here:
+                return here[0] if len(here) == 1 else None
+        if len(auctions) == 1:
+            return auctions[0]
+        return None
+
+    def no_auction_message(self, guild, hint="Bid from the auction's thread or its **Place Bid** button."):
+        if not self.guild_auctions(guild):
+            return "❌ No active auction right now."
+        return f"❌ Several auctions are running. {hint}"
         
-    async def reload_active_auction(self):
-        """Reload active auction on bot startup"""
+    async def reload_active_auctions(self):
+        """Reload active auctions on bot startup"""
+        self.wins = await run_db(auction_db.get_month_wins, self.wins_month)
+        auctions = await run_db(auction_db.get_active_auctions)
+        for auction_id, user_id, amount in await run_db(auction_db.load_escrow):
+            self.escrow.setdefault(auction_id, {})[user_id] = amount
+        for auction_id, user_id in await run_db(auction_db.get_active_bidders):
+            self.all_bidders.setdefault(auction_id, set()).add(user_id)
         await self.bot.wait_until_ready()
-        
-        auction = load_json(AUCTION_FILE)
-        if not auction:
-            return
+        await self._backfill_win_names()
+        # Place Bid buttons on existing auction messages keep working after a restart
+        self.bot.add_view(BidView(self.bot))
+        for auction in auctions:
+            self.auctions[auction["id"]] = auction
             
-        channel = self.bot.get_channel(auction.get("channel_id"))
-        if not channel:
-            return
-            
-        try:
-            # Try to fetch the existing message
-            self.live_update_message = await channel.fetch_message(auction["message_id"])
-            self.auction_message_id = auction["message_id"]
-            
-            # Restart the countdown
-            end_time = datetime.fromisoformat(auction["end_time"]).replace(tzinfo=pytz.UTC)
-            self.bot.loop.create_task(self.live_auction_countdown(channel, end_time))
-            
-        except discord.NotFound:
-            # If message not found, create a new one
-            self.live_update_message = await send_auction_embed(channel, auction, self.bot)
-            auction["message_id"] = self.live_update_message.id
-            auction["channel_id"] = channel.id
-            save_json(AUCTION_FILE, auction)
-            self.bot.loop.create_task(self.live_auction_countdown(channel, end_time))
+            channel = self.bot.get_channel(auction.get("channel_id"))
+            if channel:
+                try:
+                    # Try to fetch the existing message
+                    self.live_messages[auction["id"]] = await channel.fetch_message(auction["message_id"])
+                except discord.NotFound:
+                    # If message not found, create a new one
+                    message = await send_auction_embed(channel, auction, self.bot)
+                    self.live_messages[auction["id"]] = message
+                    auction["message_id"] = message.id
+                    auction["channel_id"] = channel.id
+                    await run_db(auction_db.update_auction, auction["id"], message_id=message.id, channel_id=channel.id)
+
+            # Only now: an auction that ended while we were offline fires straight
+            # away, and its final embed edit needs the message found above
+            self._schedule_timers(auction)
     
     async def _start_auction(self, ctx_or_interaction, item, description, days, hours, minutes, minimum_bid, is_slash, image_url=None, banner_url=None):
         channel = ctx_or_interaction.channel
         if is_slash:
             await ctx_or_interaction.response.defer()
             
-        if os.path.exists(AUCTION_FILE):
-            msg = "❌ An auction is already running."
-            if is_slash:
-                await ctx_or_interaction.followup.send(msg, ephemeral=True)
-            else:
-                await ctx_or_interaction.send(msg)
-            return
-            
         try:
             thread = await channel.create_thread(name=f"Auction: {item}", type=discord.ChannelType.public_thread)
             await thread.send(
@@ -311,203 +352,236 @@ class AuctionManager(commands.Cog):
             "channel_id": channel.id  # Add channel ID to auction data
         }
         
-        self.live_update_message = await send_auction_embed(channel, auction, self.bot)
-        auction["message_id"] = self.live_update_message.id  # Store message ID
-        save_json(AUCTION_FILE, auction)
+        message = await send_auction_embed(channel, auction, self.bot)
+        auction["message_id"] = message.id  # Store message ID
+        auction["id"] = await run_db(auction_db.create_auction, auction)
+        self.auctions[auction["id"]] = auction
+        self.live_messages[auction["id"]] = message
         
-        self.bot.loop.create_task(self.live_auction_countdown(channel, end_time))
+        self._schedule_timers(auction)
+
+    def _schedule_timers(self, auction):
+        end_ts = get_end_timestamp(auction)
+        handles = [self.scheduler.schedule(end_ts, self._end_auction, auction["id"])]
+        if end_ts - time.time() > WARNING_LEAD:
+            handles.append(self.scheduler.schedule(end_ts - WARNING_LEAD, self._warn_bidders, auction["id"]))
+        self.timers[auction["id"]] = handles
 
     async def notify_outbid_user(self, previous_bidder_id, new_bidder_mention, amount, item):
         """Notify the previous highest bidder they've been outbid"""
         if not previous_bidder_id:
             return
             
-        try:
-            # Refund the previous bidder
-            if previous_bidder_id in self.pending_refunds:
-                change_balance(int(previous_bidder_id), self.pending_refunds[previous_bidder_id])
-                del self.pending_refunds[previous_bidder_id]
-
-            user = await self.bot.fetch_user(int(previous_bidder_id))
-            dm_msg = f"⚠️ You've been outbid by {new_bidder_mention} for **{amount}** smiles on **{item}**! Your bid has been refunded."
-            await user.send(dm_msg)
-        except Exception as e:
-            print(f"Failed to DM outbid notification: {e}")
+        dm_msg = f"⚠️ You've been outbid by {new_bidder_mention} for **{amount}** smiles on **{item}**! Your bid has been refunded."
+        await self.notifier.send_dm(previous_bidder_id, dm_msg)
+
+    async def _warn_bidders(self, auction_id):
+        auction = self.auctions.get(auction_id)
+        if auction:
+            await self.send_30_minute_warning(auction)
 
     async def send_30_minute_warning(self, auction):
         """Send 30-minute warning to all bidders"""
-        if not self.all_bidders:
+        bidders = self.all_bidders.get(auction["id"])
+        if not bidders:
             return
             
         item = auction["item"]
-        thread_id = auction.get("thread_id")
-        thread = None
+        thread = self._get_thread(auction)
         
-        # Find the thread
+        warning_msg = f"⏰ **Auction ending soon!** The '{item}' auction ends in 30 minutes!"
+        report = await self.notifier.broadcast(bidders, warning_msg, fallback_channel=thread)
+        print(f"30-minute warning for '{item}': {report['sent']} DMed, "
+              f"{report['fallback']} mentioned in thread, {report['failed']} failed")
+        
+        if thread:
+            await thread.send("⏰ **Auction ending in 30 minutes!**")
+
+    def _get_thread(self, auction):
+        thread_id = auction.get("thread_id")
         if thread_id:
             for guild in self.bot.guilds:
                 thread = guild.get_thread(thread_id)
                 if thread:
-                    break
-        
-        warning_sent = set()
-        
-        for bidder_id in self.all_bidders:
-            try:
-                user = await self.bot.fetch_user(int(bidder_id))
-                if user.id not in warning_sent:
-                    warning_msg = f"⏰ **Auction ending soon!** The '{item}' auction ends in 30 minutes!"
-                    try:
-                        await user.send(warning_msg)
-                    except:
-                        # If DM fails, try to mention in thread
-                        if thread:
-                            await thread.send(f"{user.mention} {warning_msg}")
-                    warning_sent.add(user.id)
-            except Exception as e:
-                print(f"Failed to send 30-minute warning: {e}")
-        
-        if thread:
-            await thread.send("⏰ **Auction ending in 30 minutes!**")
+                    return thread
+        return None
 
-    async def _place_bid(self, user, amount, respond):
-        current_time = time.time()
-        if user.id in self.bid_cooldowns:
-            last_bid = self.bid_cooldowns[user.id]
-            if current_time - last_bid < 30:  # 30 second cooldown
-                remaining = 30 - (current_time - last_bid)
-                return await respond(f"⏱️ Please wait {remaining:.1f} seconds before bidding again")
-        
-        self.bid_cooldowns[user.id] = current_time
-    
-        auction = load_json(AUCTION_FILE)
+    async def _place_bid(self, user, amount, respond, guild, channel=None, message_id=None, max_amount=None):
+        auction = self.find_auction(guild, channel, message_id)
+        if not auction:
+            return await respond(self.no_auction_message(guild))
+
+        remaining = cooldowns.try_start("bid", user.id, 30)
+        if remaining > 0:  # 30 second cooldown
+            return await respond(f"⏱️ Please wait {remaining:.1f} seconds before bidding again")
+
+        # Bids for one auction are handled strictly one after another
+        pipeline = self.bid_pipelines.get(auction["id"])
+        if pipeline is None:
+            pipeline = self.bid_pipelines[auction["id"]] = BidPipeline(self._process_bid)
+        await pipeline.submit(auction["id"], user, amount, max_amount, respond)
+
+    async def _process_bid(self, auction_id, user, amount, max_amount, respond):
+        auction = self.auctions.get(auction_id)
         uid = str(user.id)
         if not auction:
-            return await respond("❌ No active auction right now.")  # Remove this line if using modal
-        if not can_win(user.id):
+            return await respond("❌ This auction has already ended.")
+        if not self.can_win(user.id):
             return await respond("🚫 You have reached your 4 wins/month limit.")
-        if amount <= auction["highest_bid"]:
+        top = max(amount or 0, max_amount or 0)
+        if (amount is not None and amount <= auction["highest_bid"]) or top <= auction["highest_bid"]:
             return await respond(f"❌ Your bid must be higher than the current bid: {auction['highest_bid']}")
-        if amount < auction.get("minimum_bid", 0):
+        if top < auction.get("minimum_bid", 0):
             return await respond(f"❌ Your bid must be at least the minimum bid: {auction['minimum_bid']}")
     
-        # Check user balance including any pending refund from previous bid
-        user_balance = get_balance(user.id)
-        if uid in self.pending_refunds:
-            user_balance += self.pending_refunds[uid]  # Add back pending refund
-    
-        if user_balance < amount:
-            return await respond(f"❌ You don't have enough smiles! Your balance: {user_balance}")
+        # Escrow, proxy resolution, refunding the previous leader and the bid rows all happen together
+        result, value, outbid = await run_db(auction_db.place_bid, auction_id, uid, amount, max_amount)
+        if result == "funds":
+            return await respond(f"❌ You don't have enough smiles! Your balance: {value}")
+        if result == "low":
+            return await respond(f"❌ Your bid must be higher than the current bid: {auction['highest_bid']}")
     
         # Track all bidders
-        self.all_bidders.add(uid)
-    
-        # Handle same-user rebid - refund previous bid first
-        if uid in self.pending_refunds:
-            change_balance(user.id, self.pending_refunds[uid])  # Refund previous bid
-            del self.pending_refunds[uid]
-    
-        # Deduct new bid amount from current user
-        change_balance(user.id, -amount)
-        self.pending_refunds[uid] = amount  # Track this in case they get outbid
-    
-        previous_bidder = auction.get("highest_bidder")
-        if previous_bidder and previous_bidder != uid:
-            await self.notify_outbid_user(
-                previous_bidder,
-                user.mention,
-                amount,
-                auction['item']
+        self.all_bidders.setdefault(auction_id, set()).add(uid)
+        auction["highest_bid"] = value
+        self._request_redraw(auction_id)
+
+        if result == "beaten":
+            # The leader's hidden maximum answered; only the price moved
+            return await respond(
+                f"❌ Another bidder's maximum beat yours. The current bid on **{auction['item']}** is now **{value}** smiles."
             )
-    
-        auction["highest_bid"] = amount
+
+        was_leader = auction.get("highest_bidder") == uid
+        held_bids = self.escrow.setdefault(auction_id, {})
+        held_bids[uid] = max(held_bids.get(uid, 0) if was_leader else 0, top)
+        if outbid:
+            outbid = outbid[0]
+            held_bids.pop(outbid, None)
         auction["highest_bidder"] = uid
-        save_json(AUCTION_FILE, auction)
-    
-        thread_id = auction.get("thread_id")
-        if thread_id:
-            for guild in self.bot.guilds:
-                thread = guild.get_thread(thread_id)
-                if thread:
-                    if previous_bidder and previous_bidder != uid:
-                        try:
-                            prev_user = await self.bot.fetch_user(int(previous_bidder))
-                            await thread.send(f"⚠️ {prev_user.mention}, you've been outbid by {user.mention}!")
-                        except:
-                            pass
-                    await thread.send(format_thread_bid_message(user, amount))
-                    break
-                
-        if self.live_update_message:
-            updated_embed = await build_auction_embed(auction, self.bot)
-            await self.live_update_message.edit(embed=updated_embed)
-    
-     # Only send one response
-        if not isinstance(respond, type(lambda: None)):  # If not a lambda response
-            await respond(format_bid_message(user, amount, auction['item']))
-
-    async def live_auction_countdown(self, channel, end_time_iso):
-        while True:
-            auction = load_json(AUCTION_FILE)
-            if not auction:
-                return
-                
-            end_time = datetime.fromisoformat(auction["end_time"]).replace(tzinfo=pytz.UTC)
-            now = datetime.now(pytz.UTC)
-            remaining = end_time - now
-            
-            # Check if 30 minutes remaining
-            if 1800 >= remaining.total_seconds() > 1740:  # ~30 minutes left
-                await self.send_30_minute_warning(auction)
-                
-            if remaining.total_seconds() <= 0:
-                # Force one final update to show ended status
-                if self.live_update_message:
-                    updated_embed = await build_auction_embed(auction, self.bot)
-                    await self.live_update_message.edit(embed=updated_embed)
-                break
 
-            try:
-                if self.live_update_message:
-                    updated_embed = await build_auction_embed(auction, self.bot)
-                    await self.live_update_message.edit(embed=updated_embed)
-            except Exception:
-                pass
+        # Messages don't hold up the next bid, and they go out even if the reply
+        # to the bidder fails. A leader quietly raising their maximum isn't announced.
+        if not (was_leader and amount is None):
+            self._spawn(self._announce_bid(auction, user, value, outbid))
 
-            await asyncio.sleep(30) # Changed from 60 to 30 seconds
+        if max_amount and max_amount > value:
+            await respond(
+                f"✅ {user.mention}, you're the highest bidder on **{auction['item']}** at **{value}** smiles. "
+                f"We'll bid for you up to **{held_bids[uid]}**."
+            )
+        else:
+            await respond(format_bid_message(user, value, auction['item']))
 
+    async def _announce_bid(self, auction, user, amount, outbid):
+        if outbid:
+            await self.notify_outbid_user(outbid, user.mention, amount, auction['item'])
 
-            
-        # Auction end logic
-        auction = load_json(AUCTION_FILE)
+        thread = self._get_thread(auction)
+        if thread:
+            try:
+                if outbid:
+                    prev_mention = await resolver.mention(self.bot, outbid)
+                    await thread.send(f"⚠️ {prev_mention}, you've been outbid by {user.mention}!")
+                await thread.send(format_thread_bid_message(user, amount))
+            except Exception as e:
+                print(f"Failed to post bid in auction thread: {e}")
+
+    def _request_redraw(self, auction_id):
+        if auction_id not in self.auctions:
+            return  # closed while a bid was in flight; don't bring its updater back
+        updater = self.embed_updaters.get(auction_id)
+        if updater is None:
+            updater = CoalescedUpdater(lambda: self._redraw_live_embed(auction_id), window=3)
+            self.embed_updaters[auction_id] = updater
+        updater.request()
+
+    async def _redraw_live_embed(self, auction_id):
+        auction = self.auctions.get(auction_id)
+        message = self.live_messages.get(auction_id)
+        if auction and message:
+            updated_embed = await build_auction_embed(auction, self.bot)
+            await message.edit(embed=updated_embed)
+
+    async def _close_bidding(self, auction):
+        """Stop taking bids for an auction and wait for queued ones to finish."""
+        auction_id = auction["id"]
+        self.auctions.pop(auction_id, None)
+        updater = self.embed_updaters.pop(auction_id, None)
+        if updater:
+            updater.cancel()
+        for handle in self.timers.pop(auction_id, ()):
+            self.scheduler.cancel(handle)
+        pipeline = self.bid_pipelines.pop(auction_id, None)
+        if pipeline:
+            await pipeline.close()
+        self.all_bidders.pop(auction_id, None)
+        return self.live_messages.pop(auction_id, None)
+
+    async def _settle_auction(self, auction, status="ended"):
+        """Close an auction: keep the winner's escrow and refund everyone else.
+
+        Returns the winner's mention, or None if nobody won.
+        """
+        self.escrow.pop(auction["id"], None)
+        names = {}
+        leader = auction.get("highest_bidder")
+        if leader and status == "ended":
+            names[leader] = await self._user_names(auction, leader)
+        winner_id, _ = await run_db(auction_db.settle_auction, auction["id"], status, names)
+        if winner_id:
+            wins = self.month_wins()
+            wins[winner_id] = wins.get(winner_id, 0) + 1
+            return await resolver.mention(self.bot, winner_id)
+        return None
+
+    async def _backfill_win_names(self):
+        """Name win rows that were imported without names, so /resetauctionwins finds them by name."""
+        names = {}
+        for user_id in await run_db(auction_db.get_unnamed_winners, self.wins_month):
+            for guild in self.bot.guilds:
+                member = guild.get_member(int(user_id))
+                if member:
+                    names[user_id] = (member.name, member.display_name)
+                    break
+        if names:
+            await run_db(auction_db.set_win_names, names, self.wins_month)
+
+    async def _user_names(self, auction, user_id):
+        """(username, display name) for a bidder, stored with their win for name lookups."""
+        channel = self.bot.get_channel(auction.get("channel_id"))
+        guild = getattr(channel, "guild", None)
+        member = guild.get_member(int(user_id)) if guild else None
+        if member:
+            return member.name, member.display_name
+        try:
+            user = await resolver.resolve(self.bot, user_id)
+        except discord.HTTPException:
+            user = None
+        return (user.name, user.display_name) if user else (None, None)
+
+    async def _end_auction(self, auction_id):
+        """Scheduled end of an auction."""
+        auction = self.auctions.get(auction_id)
         if not auction:
             return
-        self.all_bidders.clear()
-        winner_id = auction["highest_bidder"]
+        message = await self._close_bidding(auction)
+        winner_mention = await self._settle_auction(auction)
         item = auction["item"]
         bid = auction["highest_bid"]
-        thread_id = auction.get("thread_id")
-        
-        # Clear any pending refunds (winner keeps their money)
-        if winner_id and winner_id in self.pending_refunds:
-            del self.pending_refunds[winner_id]
-            
-        if winner_id:
-            add_win(int(winner_id))
-            user = await self.bot.fetch_user(int(winner_id))
-            end_msg = f"🎉 Auction ended! `{item}` won by {user.mention} for **{bid}** <:smile:123456789012345678>!"
+
+        if winner_mention:
+            end_msg = f"🎉 Auction ended! `{item}` won by {winner_mention} for **{bid}** <:smile:123456789012345678>!"
         else:
             end_msg = "⚠️ Auction ended with no bids."
             
-            # Refund all pending bids if no winner
-            for bidder_id, amount in self.pending_refunds.items():
-                change_balance(int(bidder_id), amount)
-            self.pending_refunds.clear()
-            
-        if self.live_update_message:
-            await self.live_update_message.edit(content=end_msg)
-        await channel.send(end_msg)
-        os.remove(AUCTION_FILE)
+        if message:
+            # The one edit at close: swap the countdown for the ended status
+            updated_embed = await build_auction_embed(auction, self.bot)
+            await message.edit(content=end_msg, embed=updated_embed)
+        channel = self.bot.get_channel(auction.get("channel_id"))
+        if channel:
+            await channel.send(end_msg)
 
     # ==== COMMANDS ====
     @app_commands.command(name="startauction", description="Start a new auction (admin only)")
@@ -593,85 +667,117 @@ class AuctionManager(commands.Cog):
     @app_commands.command(name="bid", description="Place a bid in the current auction")
     @app_commands.describe(amount="The amount of smiles you want to bid")
     async def slash_bid(self, interaction: discord.Interaction, amount: int):
-        await self._place_bid(interaction.user, amount, lambda msg: interaction.response.send_message(msg, ephemeral=True))
+        # Waiting in the bid queue can outlast the 3 second reply window
+        await interaction.response.defer(ephemeral=True)
+        await self._place_bid(
+            interaction.user, amount,
+            lambda msg: interaction.followup.send(msg, ephemeral=True),
+            interaction.guild,
+            channel=interaction.channel
+        )
     
     @commands.command(name="bid")
     async def legacy_bid(self, ctx, amount: int):
-        await self._place_bid(ctx.author, amount, lambda msg: ctx.send(msg))
+        await self._place_bid(ctx.author, amount, lambda msg: ctx.send(msg), ctx.guild, channel=ctx.channel)
+
+    @app_commands.command(name="maxbid", description="Set a hidden maximum and let the bot bid for you")
+    @app_commands.describe(maximum="The most smiles you're willing to pay")
+    async def slash_maxbid(self, interaction: discord.Interaction, maximum: int):
+        # Waiting in the bid queue can outlast the 3 second reply window
+        await interaction.response.defer(ephemeral=True)
+        await self._place_bid(
+            interaction.user, None,
+            lambda msg: interaction.followup.send(msg, ephemeral=True),
+            interaction.guild,
+            channel=interaction.channel,
+            max_amount=maximum
+        )
+
+    @commands.command(name="maxbid")
+    async def legacy_maxbid(self, ctx, maximum: int):
+        # The maximum stays hidden, so tidy away the command message when we can
+        try:
+            await ctx.message.delete()
+        except discord.HTTPException:
+            pass
+
+        async def respond(msg):
+            try:
+                await ctx.author.send(msg)
+            except discord.Forbidden:
+                # DMs closed: reply in the channel and clear it away soon after
+                await ctx.send(msg, delete_after=10)
+
+        await self._place_bid(ctx.author, None, respond, ctx.guild, channel=ctx.channel, max_amount=maximum)
 
     @app_commands.command(name="cancelauction", description="Cancel the current auction (admin only)")
-    @app_commands.describe(confirm="Type YES to confirm cancellation")
-    async def slash_cancelauction(self, interaction: discord.Interaction, confirm: str):
+    @app_commands.describe(
+        confirm="Type YES to confirm cancellation",
+        auction_id="Auction ID (only needed when several auctions are running)"
+    )
+    async def slash_cancelauction(self, interaction: discord.Interaction, confirm: str, auction_id: int = None):
         if not interaction.user.guild_permissions.administrator:
             await interaction.response.send_message("🚫 Admins only!", ephemeral=True)
             return
         if confirm != "YES":
             await interaction.response.send_message("❗ Please type YES to confirm cancellation.", ephemeral=True)
             return
-        if not os.path.exists(AUCTION_FILE):
-            await interaction.response.send_message("❌ No auction is running.", ephemeral=True)
+        auction = self.find_auction(interaction.guild, interaction.channel, auction_id=auction_id)
+        if not auction:
+            await interaction.response.send_message(self.no_auction_message(interaction.guild, "Run this in the auction's thread or pass its `auction_id`."), ephemeral=True)
             return
+        # Draining queued bids and settling can outlast the 3 second reply window
+        await interaction.response.defer(ephemeral=True)
+        message = await self._close_bidding(auction)
             
         # Refund all pending bids when auction is cancelled
-        auction = load_json(AUCTION_FILE)
-        for bidder_id, amount in self.pending_refunds.items():
-            change_balance(int(bidder_id), amount)
-        self.pending_refunds.clear()
-        self.all_bidders.clear()
+        await self._settle_auction(auction, "cancelled")
         
         # Force update the embed to show cancelled status
-        if self.live_update_message:
+        if message:
             auction["end_time"] = datetime.now(pytz.UTC).isoformat()
             updated_embed = await build_auction_embed(auction, self.bot)
-            await self.live_update_message.edit(embed=updated_embed, content="❌ AUCTION CANCELLED BY ADMIN")
+            await message.edit(embed=updated_embed, content="❌ AUCTION CANCELLED BY ADMIN")
         
-        os.remove(AUCTION_FILE)
-        await interaction.response.send_message("❌ Auction cancelled. All bids have been refunded.", ephemeral=True)
+        await interaction.followup.send("❌ Auction cancelled. All bids have been refunded.", ephemeral=True)
     
     @app_commands.command(name="endauction", description="End the current auction (admin only)")
-    @app_commands.describe(confirm="Type YES to confirm ending")
-    async def slash_endauction(self, interaction: discord.Interaction, confirm: str):
+    @app_commands.describe(
+        confirm="Type YES to confirm ending",
+        auction_id="Auction ID (only needed when several auctions are running)"
+    )
+    async def slash_endauction(self, interaction: discord.Interaction, confirm: str, auction_id: int = None):
         if not interaction.user.guild_permissions.administrator:
             await interaction.response.send_message("🚫 Admins only!", ephemeral=True)
             return
         if confirm != "YES":
             await interaction.response.send_message("❗ Please type YES to confirm ending.", ephemeral=True)
             return
-        auction = load_json(AUCTION_FILE)
+        auction = self.find_auction(interaction.guild, interaction.channel, auction_id=auction_id)
         if not auction:
-            await interaction.response.send_message("❌ No auction is running.", ephemeral=True)
+            await interaction.response.send_message(self.no_auction_message(interaction.guild, "Run this in the auction's thread or pass its `auction_id`."), ephemeral=True)
             return
+        # Draining queued bids and settling can outlast the 3 second reply window
+        await interaction.response.defer(ephemeral=True)
+        message = await self._close_bidding(auction)
             
-        self.all_bidders.clear()
-        winner_id = auction.get("highest_bidder")
+        winner_mention = await self._settle_auction(auction)
         item = auction.get("item")
         bid = auction.get("highest_bid")
-        
-        # Clear winner's pending refund (they keep the money)
-        if winner_id and winner_id in self.pending_refunds:
-            del self.pending_refunds[winner_id]
             
-        if winner_id:
-            add_win(int(winner_id))
-            user = await self.bot.fetch_user(int(winner_id))
-            end_msg = f"🎉 Auction ended! `{item}` won by {user.mention} for **{bid}** smiles!"
+        if winner_mention:
+            end_msg = f"🎉 Auction ended! `{item}` won by {winner_mention} for **{bid}** smiles!"
         else:
             end_msg = "⚠️ Auction ended with no bids."
-            
-            # Refund all pending bids if no winner
-            for bidder_id, amount in self.pending_refunds.items():
-                change_balance(int(bidder_id), amount)
-            self.pending_refunds.clear()
         
         # Force update the embed to show ended status
-        if self.live_update_message:
+        if message:
             # Set end time to now to trigger ended status
             auction["end_time"] = datetime.now(pytz.UTC).isoformat()
             updated_embed = await build_auction_embed(auction, self.bot)
-            await self.live_update_message.edit(embed=updated_embed, content=None)
+            await message.edit(embed=updated_embed, content=None)
         
-        await interaction.response.send_message(end_msg, ephemeral=True)
-        os.remove(AUCTION_FILE)
+        await interaction.followup.send(end_msg, ephemeral=True)
 
     @app_commands.command(name="updateauction", description="Update auction details (admin only)")
     @app_commands.describe(
@@ -679,7 +785,8 @@ class AuctionManager(commands.Cog):
         description="New description (optional)",
         minimum_bid="New minimum bid (optional)",
         thumbnail="New thumbnail image (optional)",
-        banner="New banner image (optional)"
+        banner="New banner image (optional)",
+        auction_id="Auction ID (only needed when several auctions are running)"
     )
     async def slash_updateauction(
         self, 
@@ -688,15 +795,16 @@ class AuctionManager(commands.Cog):
         description: str = None, 
         minimum_bid: int = None,
         thumbnail: discord.Attachment = None,
-        banner: discord.Attachment = None
+        banner: discord.Attachment = None,
+        auction_id: int = None
     ):
         if not interaction.user.guild_permissions.administrator:
             await interaction.response.send_message("🚫 Admins only!", ephemeral=True)
             return
 
-        auction = load_json(AUCTION_FILE)
+        auction = self.find_auction(interaction.guild, interaction.channel, auction_id=auction_id)
         if not auction:
-            await interaction.response.send_message("❌ No auction is running.", ephemeral=True)
+            await interaction.response.send_message(self.no_auction_message(interaction.guild, "Run this in the auction's thread or pass its `auction_id`."), ephemeral=True)
             return
 
         if item:
@@ -710,26 +818,37 @@ class AuctionManager(commands.Cog):
         if banner:
             auction["banner_url"] = banner.url
 
-        save_json(AUCTION_FILE, auction)
+        await run_db(
+            auction_db.update_auction, auction["id"],
+            item=auction["item"], description=auction.get("description"), minimum_bid=auction["minimum_bid"],
+            image_url=auction.get("image_url"), banner_url=auction.get("banner_url")
+        )
 
-        if self.live_update_message:
-            updated_embed = await build_auction_embed(auction, self.bot)
-            await self.live_update_message.edit(embed=updated_embed)
+        self._request_redraw(auction["id"])
 
         await interaction.response.send_message("✅ Auction updated.", ephemeral=True)
 
     @app_commands.command(name="auctionstatus", description="Check current auction details")
-    async def auctionstatus(self, interaction: discord.Interaction):
+    @app_commands.describe(auction_id="Auction ID (only needed when several auctions are running)")
+    async def auctionstatus(self, interaction: discord.Interaction, auction_id: int = None):
         """Check the current auction status"""
-        auction = load_json(AUCTION_FILE)
-        if not auction:
+        auctions = self.guild_auctions(interaction.guild)
+        if not auctions:
             return await interaction.response.send_message("ℹ️ No active auction currently running.", ephemeral=True)
+        auction = self.find_auction(interaction.guild, interaction.channel, auction_id=auction_id)
+        if not auction:
+            # Several auctions and no way to tell which one: list this server's
+            lines = [
+                f"**#{a['id']}** {a['item']}: {a['highest_bid']} smiles, ends <t:{int(get_end_timestamp(a))}:R>"
+                for a in auctions
+            ]
+            return await interaction.response.send_message("\n".join(lines), ephemeral=True)
 
         embed = await build_auction_embed(auction, self.bot)
         # Add additional admin-only info
         if interaction.user.guild_permissions.administrator:
-            total_bidders = len(self.all_bidders)
-            pending_refunds = sum(self.pending_refunds.values())
+            total_bidders = len(self.all_bidders.get(auction["id"], ()))
+            pending_refunds = sum(self.escrow.get(auction["id"], {}).values())
             embed.add_field(
                 name="Admin Stats",
                 value=f"• Total Bidders: {total_bidders}\n"
@@ -749,37 +868,30 @@ class AuctionManager(commands.Cog):
             await interaction.response.send_message("🚫 Admins only!", ephemeral=True)
             return
 
-        wins = load_json(WIN_TRACKER_FILE)
-
         # Reset all users
         if user.lower() == "all":
-            save_json(WIN_TRACKER_FILE, {})
+            await run_db(auction_db.reset_wins)
+            self.wins = {}
             await interaction.response.send_message("✅ Monthly auction win counters have been reset for all users.", ephemeral=True)
             return
 
-        # Try user ID first
+        # Try user ID first, then username / display name
         if user.isdigit():
-            if user in wins:
-                wins[user] = 0
-                save_json(WIN_TRACKER_FILE, wins)
-                member = interaction.guild.get_member(int(user))
-                name = member.display_name if member else user
-                await interaction.response.send_message(f"✅ Auction win counter reset for user: {name}", ephemeral=True)
-            else:
-                await interaction.response.send_message("❌ User ID not found in win tracker.", ephemeral=True)
+            reset = await run_db(auction_db.reset_wins, user)
+        else:
+            reset = await run_db(auction_db.reset_wins, name=user)
+        if not reset:
+            kind = "User ID" if user.isdigit() else "Username"
+            await interaction.response.send_message(f"❌ {kind} not found in win tracker.", ephemeral=True)
             return
 
-        # Try username
-        found = False
-        for uid, count in wins.items():
-            member = interaction.guild.get_member(int(uid))
-            if member and (member.name.lower() == user.lower() or member.display_name.lower() == user.lower()):
-                wins[uid] = 0
-                save_json(WIN_TRACKER_FILE, wins)
-                await interaction.response.send_message(f"✅ Auction win counter reset for user: {member.display_name}", ephemeral=True)
-                found = True
-        if not found:
-            await interaction.response.send_message("❌ Username not found in win tracker.", ephemeral=True)
+        wins = self.month_wins()
+        for uid, _ in reset:
+            wins[uid] = 0
+        uid, name = reset[0]
+        member = interaction.guild.get_member(int(uid)) if interaction.guild else None
+        name = member.display_name if member else (name or uid)
+        await interaction.response.send_message(f"✅ Auction win counter reset for user: {name}", ephemeral=True)
 
 
        #ERROR HANDLING#
@@ -0,0 +1,57 @@
+import asyncio
+
+
+class BidPipeline:
+    """Feeds one auction's bids through a single worker, one at a time.
+
+    Callers await submit() and get the handler's result (or exception) back,
+    but state changes never interleave, so the handler needs no locks.
+    """
+
+    _STOP = object()
+
+    def __init__(self, handler):
+        self._handler = handler
+        self._queue = asyncio.Queue()
+        self._worker = None
+
+    async def submit(self, *args):
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((args, future))
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._work())
+        return await future
+
+    async def close(self):
+        """Let already-queued bids finish, then stop the worker."""
+        if self._worker is None or self._worker.done():
+            return
+        await self._queue.put((self._STOP, None))
+        await self._worker
+
+    async def cancel(self):
+        """Stop the worker now; the bid being handled and any queued ones are cancelled."""
+        if self._worker is not None and not self._worker.done():
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if future is not None and not future.done():
+                future.cancel()
+
+    async def _work(self):
+        while True:
+            args, future = await self._queue.get()
+            if args is self._STOP:
+                return
+            try:
+                result = await self._handler(*args)
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
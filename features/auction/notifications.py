@@ -0,0 +1,97 @@
+import asyncio
+
+import discord
+
+from utils.user_resolver import resolver
+
+MAX_MESSAGE_LENGTH = 2000
+
+
+class NotificationDispatcher:
+    """Sends auction DMs to many users at once without flooding the API.
+
+    At most `concurrency` DMs are in flight. A 429 waits out its retry_after,
+    and server errors or timeouts are retried with exponential backoff.
+    Users whose DMs are closed are mentioned in the auction thread instead,
+    packed into as few messages as possible.
+    """
+
+    def __init__(self, bot, concurrency=5, retries=3, base_delay=1.0):
+        self.bot = bot
+        self.retries = retries
+        self.base_delay = base_delay
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    async def send_dm(self, user_id, message):
+        """DM one user. Returns "sent", "fallback" (DMs closed) or "failed"."""
+        async with self._semaphore:
+            try:
+                user = await resolver.resolve(self.bot, user_id)
+            except discord.HTTPException as e:
+                print(f"Failed to look up user {user_id}: {e}")
+                return "failed"
+            if user is None:
+                return "failed"
+
+            for attempt in range(self.retries + 1):
+                try:
+                    await user.send(message)
+                    return "sent"
+                except discord.Forbidden:
+                    return "fallback"
+                except discord.HTTPException as e:
+                    if e.status == 429:
+                        delay = getattr(e, "retry_after", None) or self.base_delay * 2 ** attempt
+                    elif e.status >= 500:
+                        delay = self.base_delay * 2 ** attempt
+                    else:
+                        print(f"Failed to DM {user_id}: {e}")
+                        return "failed"
+                except (asyncio.TimeoutError, OSError):
+                    delay = self.base_delay * 2 ** attempt
+                if attempt < self.retries:
+                    await asyncio.sleep(delay)
+            print(f"Gave up DMing {user_id} after {self.retries + 1} attempts")
+            return "failed"
+
+    async def broadcast(self, user_ids, message, fallback_channel=None):
+        """DM everyone in user_ids and return {"sent", "fallback", "failed"} counts.
+
+        Users who can't be DMed are mentioned in fallback_channel, if given;
+        without one they count as failed.
+        """
+        user_ids = list(dict.fromkeys(str(uid) for uid in user_ids))
+        results = await asyncio.gather(*(self.send_dm(uid, message) for uid in user_ids))
+
+        report = {"sent": 0, "fallback": 0, "failed": 0}
+        fallback_ids = []
+        for user_id, result in zip(user_ids, results):
+            if result == "fallback":
+                fallback_ids.append(user_id)
+            else:
+                report[result] += 1
+
+        if fallback_ids and fallback_channel:
+            try:
+                await self.mention_in_batches(fallback_channel, fallback_ids, message)
+                report["fallback"] = len(fallback_ids)
+            except discord.HTTPException as e:
+                print(f"Failed to post fallback mentions: {e}")
+                report["failed"] += len(fallback_ids)
+        else:
+            report["failed"] += len(fallback_ids)
+        return report
+
+    async def mention_in_batches(self, channel, user_ids, message):
+        """Mention users ahead of message, as few posts as fit under Discord's length limit."""
+        budget = MAX_MESSAGE_LENGTH - len(message) - 1
+        batch, length = [], 0
+        for user_id in user_ids:
+            mention = f"<@{user_id}>"
+            if batch and length + len(mention) + 1 > budget:
+                await channel.send(f"{' '.join(batch)} {message}")
+                batch, length = [], 0
+            batch.append(mention)
+            length += len(mention) + 1
+        if batch:
+            await channel.send(f"{' '.join(batch)} {message}")
@@ -230,8 +230,8 @@ class TriviaAndChatStarter(commands.Cog):
             msg = await self.bot.wait_for("message", timeout=300, check=check)
     
             try:
-                from database.coin_db import change_balance
-                change_balance(msg.author.id, 10)
+                from database.coin_db import change_balance_async
+                await change_balance_async(msg.author.id, 10, "trivia")
                 reward_msg = f"🎉 {msg.author.mention} got it right and earned 10 smiles"
             except Exception as e:
                 print(f"Couldn't award coins: {e}")
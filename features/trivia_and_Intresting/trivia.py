@@ -6,7 +6,7 @@ import html
 import os
 import random
 from dotenv import load_dotenv
-from database.coin_db import change_balance  # Make sure this import is correct
+from database.coin_db import change_balance_async  # Make sure this import is correct
 
 load_dotenv()
 TRIVIA_CHANNEL_ID = int(os.getenv("TRIVIA_CHANNEL_ID", "0"))  # Fetch from .env
@@ -62,7 +62,7 @@ class Trivia(commands.Cog):
         try:
             msg = await self.bot.wait_for("message", timeout=240, check=check)
             await msg.add_reaction("✅")
-            change_balance(msg.author.id, 10)
+            await change_balance_async(msg.author.id, 10, "trivia")
             await channel.send(f"🎉 {msg.author.mention} got it right and earned 10 coins!")
             await self.current_message.delete()
             self.current_message = None
@@ -3,6 +3,9 @@ from discord.ext import commands
 import os
 from dotenv import load_dotenv
 import database.coin_db as coin_db
+import database.auction_db as auction_db
+import database.shop_db as shop_db
+from database.cooldowns import cooldowns
 from flask import Flask, Response
 import threading
 import asyncio
@@ -45,6 +48,9 @@ async def on_ready():
 
 @bot.event
 async def setup_hook():
+    # Restore persisted cooldowns before any cog can check them
+    await cooldowns.run()
+
     # Load all Cogs
     extensions = [
         "commands.admin_give",
@@ -84,6 +90,8 @@ async def status_task():
 
 # Initialize DB
 coin_db.init_db()
+auction_db.init_auction_db()
+shop_db.init_shop_db()
 
 if __name__ == '__main__':
     try:
@@ -93,4 +101,7 @@ if __name__ == '__main__':
     except KeyboardInterrupt:
         print("🛑 Bot shutting down...")
     except Exception as e:
-        print(f"❌ Unexpected error: {e}")
\ No newline at end of file
+        print(f"❌ Unexpected error: {e}")
+    finally:
+        cooldowns.flush()
+        coin_db.close_db()
\ No newline at end of file
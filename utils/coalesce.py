@@ -0,0 +1,42 @@
+import asyncio
+
+
+class CoalescedUpdater:
+    """Run an async redraw at most once per window, always with the latest state.
+
+    The first request redraws right away. Requests that arrive while the
+    window is open are merged into a single trailing redraw.
+    """
+
+    def __init__(self, redraw, window=3.0):
+        self._redraw = redraw
+        self.window = window
+        self._dirty = False
+        self._task = None
+
+    def request(self):
+        self._dirty = True
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """cancel() and wait for a redraw in progress to stop."""
+        task = self._task
+        self.cancel()
+        if task is not None:
+            await asyncio.gather(task, return_exceptions=True)
+
+    def cancel(self):
+        self._dirty = False
+        if self._task and not self._task.done():
+            self._task.cancel()
+        self._task = None
+
+    async def _run(self):
+        while self._dirty:
+            self._dirty = False
+            try:
+                await self._redraw()
+            except Exception as e:
+                print(f"❌ Coalesced update failed: {e}")
+            await asyncio.sleep(self.window)
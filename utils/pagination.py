@@ -0,0 +1,71 @@
+import discord
+from discord.ui import View, Button
+
+
+def split_page(rows, page_size, key):
+    """Split a page_size + 1 fetch into (page rows, cursor for the next page or None)."""
+    if len(rows) > page_size:
+        return rows[:page_size], key(rows[page_size - 1])
+    return rows, None
+
+
+class KeysetPaginator(View):
+    """Previous/next buttons over pages fetched lazily with keyset cursors.
+
+    load_page(after) returns (embed, next_after): after is the cursor from
+    the last row of the page before (None for the first page) and next_after
+    is None on the last page. The view only keeps the cursors of pages
+    already visited, so a deep page costs the same to fetch as the first.
+    """
+
+    def __init__(self, load_page, owner_id=None, timeout=180):
+        super().__init__(timeout=timeout)
+        self.load_page = load_page
+        self.owner_id = owner_id
+        self.cursors = [None]  # start cursor of each page up to the current one
+        self.next_after = None
+
+        self.prev_btn = Button(label="Previous", style=discord.ButtonStyle.grey, emoji="⏪")
+        self.prev_btn.callback = self.prev_callback
+        self.add_item(self.prev_btn)
+
+        self.page_btn = Button(label="Page 1", style=discord.ButtonStyle.grey, disabled=True)
+        self.add_item(self.page_btn)
+
+        self.next_btn = Button(label="Next", style=discord.ButtonStyle.grey, emoji="⏩")
+        self.next_btn.callback = self.next_callback
+        self.add_item(self.next_btn)
+
+    async def start(self):
+        """Load the first page and return its embed."""
+        embed, self.next_after = await self.load_page(None)
+        self._update_buttons()
+        return embed
+
+    def _update_buttons(self):
+        self.prev_btn.disabled = len(self.cursors) == 1
+        self.next_btn.disabled = self.next_after is None
+        self.page_btn.label = f"Page {len(self.cursors)}"
+
+    async def interaction_check(self, interaction: discord.Interaction):
+        if self.owner_id is not None and interaction.user.id != self.owner_id:
+            await interaction.response.send_message(
+                "❌ Only the person who ran this command can turn its pages.", ephemeral=True
+            )
+            return False
+        return True
+
+    async def prev_callback(self, interaction: discord.Interaction):
+        if len(self.cursors) > 1:
+            self.cursors.pop()
+        await self._show(interaction)
+
+    async def next_callback(self, interaction: discord.Interaction):
+        if self.next_after is not None:
+            self.cursors.append(self.next_after)
+        await self._show(interaction)
+
+    async def _show(self, interaction):
+        embed, self.next_after = await self.load_page(self.cursors[-1])
+        self._update_buttons()
+        await interaction.response.edit_message(embed=embed, view=self)
@@ -0,0 +1,67 @@
+import asyncio
+import heapq
+import itertools
+import time
+
+
+class TimerScheduler:
+    """Runs callbacks at given unix times from a single task.
+
+    Pending timers live in a min-heap; the task sleeps until the earliest one
+    (or until an earlier timer is added), so idle cost doesn't grow with the
+    number of timers. Callbacks are coroutine functions and each runs in its
+    own task so a slow one can't delay the rest.
+    """
+
+    def __init__(self):
+        self._heap = []  # [when, seq, callback, args, cancelled]
+        self._seq = itertools.count()
+        self._wake = asyncio.Event()
+        self._task = None
+        self._running = set()  # callback tasks, held so they aren't garbage collected mid-run
+
+    def schedule(self, when, callback, *args):
+        """Run callback(*args) at unix time `when`. Returns a handle for cancel()."""
+        entry = [when, next(self._seq), callback, args, False]
+        heapq.heappush(self._heap, entry)
+        if self._heap[0] is entry:
+            self._wake.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return entry
+
+    @staticmethod
+    def cancel(handle):
+        handle[4] = True
+
+    async def close(self):
+        """Drop pending timers and cancel the timer task and any running callbacks."""
+        self._heap.clear()
+        tasks = [task for task in (self._task, *self._running) if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run(self):
+        while True:
+            while self._heap and self._heap[0][4]:
+                heapq.heappop(self._heap)
+            delay = self._heap[0][0] - time.time() if self._heap else None
+            if delay is None or delay > 0:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            _, _, callback, args, _ = heapq.heappop(self._heap)
+            task = asyncio.create_task(self._fire(callback, args))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    @staticmethod
+    async def _fire(callback, args):
+        try:
+            await callback(*args)
+        except Exception as e:
+            print(f"❌ Scheduled task {getattr(callback, '__name__', callback)} failed: {e}")
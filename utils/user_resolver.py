@@ -0,0 +1,72 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+import discord
+
+
+class UserResolver:
+    """Turns user ids into discord.User objects with as few REST calls as possible.
+
+    The gateway cache (bot.get_user) is tried first. Users that had to be
+    fetched are kept in an LRU cache for `ttl` seconds; ids that no longer
+    exist are remembered as None for `negative_ttl` seconds. Concurrent
+    lookups of the same id share one fetch_user call.
+    """
+
+    def __init__(self, maxsize=5000, ttl=3600, negative_ttl=600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._cache = OrderedDict()  # user_id -> (user or None, expires_at)
+        self._inflight = {}          # user_id -> fetch task
+
+    async def resolve(self, bot, user_id):
+        """The User for an id, or None if the account doesn't exist.
+
+        Transient API errors are raised and not cached.
+        """
+        uid = int(user_id)
+        user = bot.get_user(uid)
+        if user is not None:
+            return user
+
+        entry = self._cache.get(uid)
+        if entry is not None:
+            if entry[1] > time.time():
+                self._cache.move_to_end(uid)
+                return entry[0]
+            del self._cache[uid]
+
+        task = self._inflight.get(uid)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(bot, uid))
+            self._inflight[uid] = task
+            task.add_done_callback(lambda _: self._inflight.pop(uid, None))
+        return await asyncio.shield(task)
+
+    async def mention(self, bot, user_id):
+        """A mention for the user, or the bare id in backticks if they can't be resolved."""
+        try:
+            user = await self.resolve(bot, user_id)
+        except discord.HTTPException:
+            user = None
+        return user.mention if user else f"`{user_id}`"
+
+    async def _fetch(self, bot, uid):
+        try:
+            user = await bot.fetch_user(uid)
+        except discord.NotFound:
+            self._store(uid, None, self.negative_ttl)
+            return None
+        self._store(uid, user, self.ttl)
+        return user
+
+    def _store(self, uid, user, ttl):
+        self._cache[uid] = (user, time.time() + ttl)
+        self._cache.move_to_end(uid)
+        while len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+
+
+resolver = UserResolver()